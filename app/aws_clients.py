@@ -0,0 +1,40 @@
+"""
+Shared AWS session and client factory
+All modules create their boto3 clients here so a Lambda container resolves
+credentials and loads service models once
+"""
+import threading
+import boto3
+from typing import Any, Dict, Optional, Tuple
+from botocore.config import Config as BotoConfig
+
+
+# Single boto3 session per container (credential chain, loader and endpoint
+# data are shared by every client created from it)
+_SESSION = boto3.session.Session()
+_clients: Dict[Tuple[str, Optional[str]], Any] = {}
+_clients_lock = threading.Lock()
+
+
+def get_client(service_name: str, region_name: Optional[str] = None,
+               config: Optional[BotoConfig] = None):
+    """Get or create a cached boto3 client from the shared session
+
+    Args:
+        service_name: AWS service name (e.g. 'bedrock-runtime', 'lambda')
+        region_name: AWS region, or None for the session default
+        config: botocore Config used when the client is first created
+
+    Returns:
+        boto3 client for the service and region
+    """
+    key = (service_name, region_name)
+    client = _clients.get(key)
+    if client is None:
+        # boto3 sessions are not thread-safe for client creation
+        with _clients_lock:
+            client = _clients.get(key)
+            if client is None:
+                client = _SESSION.client(service_name, region_name=region_name, config=config)
+                _clients[key] = client
+    return client
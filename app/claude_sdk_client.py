@@ -2,11 +2,33 @@
 Client for interacting with the Claude SDK TypeScript Lambda function
 This provides an alternative to the direct Bedrock integration
 """
-import json
 import os
+import time
 import requests
+from urllib3.util.retry import Retry
 from typing import Dict, Any, List, Optional
 from config import config
+from http_clients import create_session, post_json
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+# Module-level session shared by all ClaudeSDKClient instances, reused by warm Lambda containers
+_SESSION = create_session(
+    pool_connections=1,
+    pool_maxsize=10,
+    max_retries=Retry(total=2, backoff_factor=0.1, status_forcelist=[502, 503, 504]),
+    mount_http=True
+)
+
+# Health check caching / circuit breaker settings
+HEALTH_CHECK_TTL_SECONDS = 30
+HEALTH_CHECK_TIMEOUT = (0.5, 1.0)  # (connect, read)
+BREAKER_FAILURE_THRESHOLD = 5
+BREAKER_OPEN_SECONDS = 30
 
 
 class ClaudeSDKClient:
@@ -26,6 +48,12 @@ class ClaudeSDKClient:
             else:
                 # Fallback for local development
                 self.api_endpoint = "http://localhost:3000/claude-sdk"
+        
+        # Cached health check state
+        self._available = False
+        self._available_until = 0.0
+        self._consecutive_failures = 0
+        self._breaker_open_until = 0.0
     
     def generate_recipe(self, user_input: str, channel: str = None, user_id: str = None) -> Dict[str, Any]:
         """
@@ -48,10 +76,10 @@ class ClaudeSDKClient:
             }
             
             # Make request to Claude SDK Lambda
-            response = requests.post(
+            response = post_json(
+                _SESSION,
                 self.api_endpoint,
-                json=payload,
-                headers={'Content-Type': 'application/json'},
+                payload,
                 timeout=25  # 25 second timeout
             )
             
@@ -66,8 +94,9 @@ class ClaudeSDKClient:
                 }
             
             # Parse response
-            result = response.json()
-            return result
+            if orjson is not None:
+                return orjson.loads(response.content)
+            return response.json()
             
         except requests.exceptions.Timeout:
             return {
@@ -94,13 +123,36 @@ class ClaudeSDKClient:
             }
     
     def is_available(self) -> bool:
-        """Check if Claude SDK service is available"""
+        """Check if Claude SDK service is available
+        
+        A successful probe is cached for HEALTH_CHECK_TTL_SECONDS, and after
+        BREAKER_FAILURE_THRESHOLD consecutive failures the breaker opens and
+        this returns False without a network call for BREAKER_OPEN_SECONDS.
+        """
+        now = time.monotonic()
+        if now < self._breaker_open_until:
+            return False
+        if now < self._available_until:
+            return self._available
+        
         try:
             # Try a simple health check
-            response = requests.get(
+            response = _SESSION.get(
                 self.api_endpoint.replace('/claude-sdk', '/health'),
-                timeout=5
+                timeout=HEALTH_CHECK_TIMEOUT
             )
-            return response.status_code == 200
-        except:
-            return False
\ No newline at end of file
+            available = response.status_code == 200
+        except requests.RequestException:
+            available = False
+        
+        self._available = available
+        if available:
+            self._consecutive_failures = 0
+            self._available_until = now + HEALTH_CHECK_TTL_SECONDS
+        else:
+            # Failures are not cached; the breaker bounds how often we re-probe
+            self._consecutive_failures += 1
+            if self._consecutive_failures >= BREAKER_FAILURE_THRESHOLD:
+                self._breaker_open_until = now + BREAKER_OPEN_SECONDS
+                self._consecutive_failures = 0
+        return available
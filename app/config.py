@@ -13,16 +13,31 @@ class Config:
         self.aws_region = os.environ.get("BEDROCK_REGION", "ap-northeast-1")
         self.bedrock_model_id = os.environ.get(
             "BEDROCK_MODEL_ID", 
-            "anthropic.claude-3-5-sonnet-20240620-v1:0"
+            "anthropic.claude-3-haiku-20240307-v1:0"
         )
+        self.bedrock_temperature = float(os.environ.get("BEDROCK_TEMPERATURE", "0.7"))
+        self.bedrock_latency_optimized = os.environ.get("BEDROCK_LATENCY_OPTIMIZED", "false").lower() == "true"
+        self.bedrock_streaming = os.environ.get("BEDROCK_STREAMING", "false").lower() == "true"
+        # Only for models that support prompt caching, with prefixes above their minimum cacheable length
+        self.bedrock_prompt_caching = os.environ.get("BEDROCK_PROMPT_CACHING", "false").lower() == "true"
+        
+        # Bedrock batch inference (offline/backfill generation only)
+        self.bedrock_batch_bucket = os.environ.get("BEDROCK_BATCH_BUCKET")
+        self.bedrock_batch_role_arn = os.environ.get("BEDROCK_BATCH_ROLE_ARN")
         
         # Logging
         self.log_level = os.environ.get("LOG_LEVEL", "INFO")
         
+        # Handler initialization (eager at cold start unless LAZY_HANDLER_INIT=1)
+        self.lazy_handler_init = os.environ.get("LAZY_HANDLER_INIT", "0") == "1"
+        
         # LINE Configuration
         self.line_channel_access_token = os.environ.get("LINE_CHANNEL_ACCESS_TOKEN")
         self.line_channel_secret = os.environ.get("LINE_CHANNEL_SECRET")
         self.use_flex_message = os.environ.get("USE_FLEX_MESSAGE", "true").lower() == "true"
+        # When set, LINE webhooks are ACKed immediately and processed by an
+        # asynchronous invocation of this function (name of the function to invoke)
+        self.line_async_function_name = os.environ.get("LINE_ASYNC_FUNCTION_NAME", "")
         
         # Slack Configuration
         self.slack_bot_token = os.environ.get("SLACK_BOT_TOKEN")
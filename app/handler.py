@@ -3,12 +3,25 @@ Simplified Lambda handler for dinner suggestion bot
 Routes requests to LINE or Slack handlers
 """
 import json
+import logging
 from typing import Dict, Any, Optional
-from line_bot import LineBotHandler
-from slack_bot import SlackBotHandler
+from config import config
+from aws_clients import get_client
 
+logger = logging.getLogger(__name__)
+logger.setLevel(config.log_level)
 
-# Global handler instances (lazy loading)
+
+# Event key carrying a LINE webhook handed off by _handle_line to an
+# asynchronous invocation of this function
+LINE_ASYNC_EVENT_KEY = 'line_async_webhook'
+
+
+# Global handler instances
+# Both handlers are built during the Lambda init phase (see below) so the first
+# webhook after a cold start does not pay for SDK and client construction. With
+# LAZY_HANDLER_INIT=1 they are created on first use instead, importing only the
+# channel module actually being served.
 _line_handler = None
 _slack_handler = None
 
@@ -18,9 +31,10 @@ def get_line_handler():
     global _line_handler
     if _line_handler is None:
         try:
+            from line_bot import LineBotHandler
             _line_handler = LineBotHandler()
         except Exception as e:
-            print(f"Failed to initialize LINE handler: {str(e)}")
+            logger.error("Failed to initialize LINE handler: %s", e)
     return _line_handler
 
 
@@ -29,174 +43,260 @@ def get_slack_handler():
     global _slack_handler
     if _slack_handler is None:
         try:
+            from slack_bot import SlackBotHandler
             _slack_handler = SlackBotHandler()
         except Exception as e:
-            print(f"Failed to initialize Slack handler: {str(e)}")
+            logger.error("Failed to initialize Slack handler: %s", e)
     return _slack_handler
 
 
-def detect_channel(event: Dict[str, Any]) -> Optional[str]:
-    """Detect which channel the request is from"""
-    print(f"DEBUG: Full event structure: {json.dumps(event, indent=2, default=str)}")
-    headers = event.get('headers', {})
-    body = event.get('body', '')
-    path = event.get('path', '')
-    
-    print(f"DEBUG: Headers: {headers}")
-    print(f"DEBUG: Path: {path}")
-    print(f"DEBUG: Body: {body[:100]}...")
+if not config.lazy_handler_init:
+    # Skip unconfigured channels so e.g. a Slack-only deployment never imports linebot
+    if config.validate_line_config()[0]:
+        get_line_handler()
+    if config.validate_slack_config()[0]:
+        get_slack_handler()
+
+
+def detect_channel(event: Dict[str, Any], path: Optional[str] = None,
+                   headers: Optional[Dict[str, str]] = None,
+                   body: Optional[str] = None) -> Optional[str]:
+    """Detect which channel the request is from
+
+    Args:
+        event: Lambda event (used for values not passed explicitly)
+        path: Request path already read from the event
+        headers: Request headers already read from the event
+        body: Request body already read from the event
+
+    Returns:
+        'line', 'slack', or None if the channel could not be detected
+    """
+    if path is None:
+        path = event.get('path') or ''
     
-    # Check path first - API Gateway routes
+    # Check path first - API Gateway routes (no header/body work needed)
     if '/slack' in path:
-        print("DEBUG: Detected Slack from path")
+        logger.debug("Detected Slack from path")
         return 'slack'
     if '/line' in path:
-        print("DEBUG: Detected LINE from path")
+        logger.debug("Detected LINE from path")
         return 'line'
     
-    # Check for headers (case-insensitive)
-    headers_lower = {k.lower(): v for k, v in headers.items()}
+    if headers is None:
+        headers = event.get('headers') or {}
+    if body is None:
+        body = event.get('body') or ''
     
-    if 'x-line-signature' in headers_lower:
-        print("DEBUG: Detected LINE from signature header")
-        return 'line'
+    # Full event dumps are multi-KB and may contain user text; only emit at DEBUG
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug("Full event structure: %s", json.dumps(event, indent=2, default=str))
+        logger.debug("Headers: %s", headers)
+        logger.debug("Body: %s...", body[:100])
     
-    if 'x-slack-signature' in headers_lower:
-        print("DEBUG: Detected Slack from signature header")
-        return 'slack'
+    # Check for signature headers (case-insensitive) without copying the dict
+    for name in headers:
+        name_lower = name.lower()
+        if name_lower == 'x-line-signature':
+            logger.debug("Detected LINE from signature header")
+            return 'line'
+        if name_lower == 'x-slack-signature':
+            logger.debug("Detected Slack from signature header")
+            return 'slack'
     
     # Check body content for additional hints
     try:
         if body:
             # Check if it's URL-encoded (Slack slash command)
             if 'command=' in body and 'text=' in body:
-                print("DEBUG: Detected Slack from command in body")
+                logger.debug("Detected Slack from command in body")
                 return 'slack'
-            
-            # Check if it's JSON
+
+            # Webhook payloads are JSON objects; skip parsing anything else
+            if not body.lstrip().startswith('{'):
+                logger.debug("Could not detect channel")
+                return None
+
+            # Cheap sniff of the top-level keys before paying for a full parse
+            # (LINE: {"destination":...,"events":[...]}, Slack: {"type":...})
+            head = body[:256]
+            if '"events"' in head:
+                logger.debug("Detected LINE from events key")
+                return 'line'
+            if '"type"' in head or '"event"' in head:
+                logger.debug("Detected Slack from event key")
+                return 'slack'
+
+            # Ambiguous prefix - fall back to a full parse
             body_json = json.loads(body)
             
             # LINE webhook events have specific structure
             if 'events' in body_json and isinstance(body_json['events'], list):
-                print("DEBUG: Detected LINE from events structure")
+                logger.debug("Detected LINE from events structure")
                 return 'line'
             
             # Slack events have type field
             if 'type' in body_json or 'event' in body_json:
-                print("DEBUG: Detected Slack from event structure")
+                logger.debug("Detected Slack from event structure")
                 return 'slack'
     except Exception as e:
-        print(f"DEBUG: Body parsing failed: {str(e)}")
+        logger.debug("Body parsing failed: %s", e)
     
-    print("DEBUG: Could not detect channel")
+    logger.debug("Could not detect channel")
     return None
 
 
+def _handle_line(event: Dict[str, Any], body: str, headers: Dict[str, str]) -> Dict[str, Any]:
+    """Route a LINE webhook event to the LINE handler"""
+    handler = get_line_handler()
+    if not handler:
+        return {
+            'statusCode': 503,
+            'body': json.dumps({'error': 'LINE handler not available'})
+        }
+    
+    signature = headers.get('x-line-signature', '')
+    
+    # Fast-ACK: LINE redelivers webhooks that are not answered within a couple
+    # of seconds, so recipe generation runs in an async invocation instead
+    if config.line_async_function_name:
+        # line_bot is already imported once a handler exists; reuse its prebuilt bodies
+        from line_bot import OK_BODY, INVALID_SIGNATURE_BODY
+        if not handler.verify_signature(body, signature):
+            return {
+                'statusCode': 400,
+                'body': INVALID_SIGNATURE_BODY
+            }
+        try:
+            get_client('lambda').invoke(
+                FunctionName=config.line_async_function_name,
+                InvocationType='Event',
+                Payload=json.dumps({LINE_ASYNC_EVENT_KEY: {'body': body, 'signature': signature}})
+            )
+            return {'statusCode': 200, 'body': OK_BODY}
+        except Exception as e:
+            logger.exception("Async LINE dispatch failed, handling inline: %s", e)
+    
+    return handler.handle_webhook(body, signature)
+
+
+def _handle_line_async(payload: Dict[str, str]) -> Dict[str, Any]:
+    """Process a LINE webhook handed off by _handle_line (reply tokens stay valid for a minute)"""
+    handler = get_line_handler()
+    if not handler:
+        return {
+            'statusCode': 503,
+            'body': json.dumps({'error': 'LINE handler not available'})
+        }
+    
+    # The signature is checked again, so only genuine LINE payloads are processed
+    return handler.handle_webhook(payload.get('body', ''), payload.get('signature', ''))
+
+
+def _handle_slack(event: Dict[str, Any], body: str, headers: Dict[str, str]) -> Dict[str, Any]:
+    """Route a Slack slash command or event to the Slack handler"""
+    handler = get_slack_handler()
+    if not handler:
+        return {
+            'statusCode': 503,
+            'body': json.dumps({'error': 'Slack handler not available'})
+        }
+    
+    # Handle base64 encoded body from API Gateway
+    is_base64_encoded = event.get('isBase64Encoded', False)
+    if is_base64_encoded:
+        import base64
+        body = base64.b64decode(body).decode('utf-8')
+        logger.debug("Decoded base64 body: %.100s...", body)
+    
+    # Check if it's a slash command or event
+    if 'command=' in body:
+        logger.debug("Processing slash command: %.100s...", body)
+        try:
+            result = handler.handle_slash_command(body, headers)
+            logger.debug("Slash command result: %s", result.get('statusCode', 'unknown'))
+            return result
+        except Exception as e:
+            logger.exception("Slash command failed: %s", e)
+            raise
+    
+    logger.debug("Processing event: %.100s...", body)
+    return handler.handle_event(body, headers)
+
+
+# Channel name -> route function
+_ROUTES = {
+    'line': _handle_line,
+    'slack': _handle_slack,
+}
+
+
 def lambda_handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
     """
     AWS Lambda main handler function
     Routes requests to appropriate channel handler
     """
-    print(f"Lambda handler invoked: {event.get('path', '/')}")
+    # Asynchronous self-invocation carrying a LINE webhook (see _handle_line)
+    if LINE_ASYNC_EVENT_KEY in event:
+        logger.info("Processing deferred LINE webhook")
+        return _handle_line_async(event[LINE_ASYNC_EVENT_KEY])
+    
+    # Read the request fields once and pass them down
+    path = event.get('path') or ''
+    headers = event.get('headers') or {}
+    body = event.get('body') or ''
+    logger.info("Lambda handler invoked: %s", path or '/')
     
     try:
         # Detect channel
-        channel = detect_channel(event)
+        channel = detect_channel(event, path, headers, body)
         
         # Fallback: if we can't detect but the path suggests Slack, assume Slack
         if not channel:
-            path = event.get('path', '')
             raw_path = event.get('rawPath', '')
             request_context = event.get('requestContext', {})
             resource_path = request_context.get('resourcePath', '')
             
-            print(f"DEBUG: Fallback - path='{path}', rawPath='{raw_path}', resourcePath='{resource_path}'")
+            logger.debug("Fallback - path='%s', rawPath='%s', resourcePath='%s'", path, raw_path, resource_path)
             
             # Check multiple possible path sources
             all_paths = [path, raw_path, resource_path]
             for check_path in all_paths:
                 if check_path and '/slack' in str(check_path):
-                    print("DEBUG: Fallback detection - assuming Slack from path")
+                    logger.debug("Fallback detection - assuming Slack from path")
                     channel = 'slack'
                     break
                 elif check_path and '/line' in str(check_path):
-                    print("DEBUG: Fallback detection - assuming LINE from path") 
+                    logger.debug("Fallback detection - assuming LINE from path")
                     channel = 'line'
                     break
         
         # Ultimate fallback: if it looks like a Slack command, assume Slack
         if not channel:
-            body = event.get('body', '')
             if 'command=' in body and ('text=' in body or 'user_name=' in body):
-                print("DEBUG: Ultimate fallback - assuming Slack from command structure")
+                logger.debug("Ultimate fallback - assuming Slack from command structure")
                 channel = 'slack'
         
         if not channel:
-            print("Could not detect channel from request")
+            logger.warning("Could not detect channel from request")
             return {
                 'statusCode': 400,
                 'body': json.dumps({'error': 'Could not detect channel'})
             }
         
-        print(f"Detected channel: {channel}")
+        logger.info("Detected channel: %s", channel)
         
         # Route to appropriate handler
-        if channel == 'line':
-            handler = get_line_handler()
-            if not handler:
-                return {
-                    'statusCode': 503,
-                    'body': json.dumps({'error': 'LINE handler not available'})
-                }
-            
-            body = event.get('body', '')
-            signature = event.get('headers', {}).get('x-line-signature', '')
-            return handler.handle_webhook(body, signature)
-            
-        elif channel == 'slack':
-            handler = get_slack_handler()
-            if not handler:
-                return {
-                    'statusCode': 503,
-                    'body': json.dumps({'error': 'Slack handler not available'})
-                }
-            
-            body = event.get('body', '')
-            headers = event.get('headers', {})
-            
-            # Handle base64 encoded body from API Gateway
-            is_base64_encoded = event.get('isBase64Encoded', False)
-            if is_base64_encoded:
-                import base64
-                body = base64.b64decode(body).decode('utf-8')
-                print(f"DEBUG: Decoded base64 body: {body[:100]}...")
-            
-            # Check if it's a slash command or event
-            if 'command=' in body:
-                print(f"DEBUG: Processing slash command: {body[:100]}...")
-                try:
-                    result = handler.handle_slash_command(body, headers)
-                    print(f"DEBUG: Slash command result: {result.get('statusCode', 'unknown')}")
-                    return result
-                except Exception as e:
-                    print(f"ERROR: Slash command failed: {str(e)}")
-                    import traceback
-                    print(f"TRACEBACK: {traceback.format_exc()}")
-                    raise
-            else:
-                print(f"DEBUG: Processing event: {body[:100]}...")
-                return handler.handle_event(body, headers)
-        
-        else:
+        route = _ROUTES.get(channel)
+        if route is None:
             return {
                 'statusCode': 400,
                 'body': json.dumps({'error': f'Unsupported channel: {channel}'})
             }
+        return route(event, body, headers)
             
     except Exception as e:
-        print(f"ERROR: Unexpected error in Lambda handler: {str(e)}")
-        import traceback
-        print(f"TRACEBACK: {traceback.format_exc()}")
+        logger.exception("Unexpected error in Lambda handler: %s", e)
         return {
             'statusCode': 500,
             'body': json.dumps({'error': 'Internal server error'})
@@ -0,0 +1,59 @@
+"""
+Shared HTTP session factory and JSON helpers
+LINE, Slack and Claude SDK modules build their keep-alive sessions and
+serialize JSON bodies here so the settings live in one place
+"""
+import json
+import requests
+from requests.adapters import HTTPAdapter
+from typing import Any, Dict, Union
+from urllib3.util.retry import Retry
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def dumps(obj: Any) -> str:
+    """Serialize a response body to a JSON string (orjson when available)"""
+    # Lambda proxy responses must carry 'body' as str: the runtime JSON-encodes
+    # the whole response dict, so raw bytes would fail to serialize
+    if orjson is not None:
+        return orjson.dumps(obj).decode('utf-8')
+    return json.dumps(obj)
+
+
+def create_session(pool_connections: int, pool_maxsize: int,
+                   max_retries: Union[int, Retry] = 0, mount_http: bool = False) -> requests.Session:
+    """Create a keep-alive HTTP session
+
+    Callers keep the session at module level so warm Lambda containers
+    reuse the TLS connection.
+
+    Args:
+        pool_connections: Number of host pools to cache
+        pool_maxsize: Maximum connections kept per host
+        max_retries: Retry count or urllib3 Retry policy for the adapter
+        mount_http: Also mount the adapter for plain http:// URLs
+
+    Returns:
+        requests.Session with the pooled adapter mounted
+    """
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=pool_connections, pool_maxsize=pool_maxsize,
+                          max_retries=max_retries)
+    session.mount('https://', adapter)
+    if mount_http:
+        session.mount('http://', adapter)
+    return session
+
+
+def post_json(session: requests.Session, url: str, payload: Dict[str, Any],
+              timeout: float) -> requests.Response:
+    """POST a JSON payload on a session (encoded with orjson when available)"""
+    if orjson is not None:
+        data = orjson.dumps(payload)
+    else:
+        data = json.dumps(payload).encode('utf-8')
+    return session.post(url, data=data, headers={'Content-Type': 'application/json'}, timeout=timeout)
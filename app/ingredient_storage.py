@@ -1,18 +1,86 @@
 """
 Ingredient storage service for DynamoDB operations
 """
-import boto3
 import json
-from typing import List, Dict, Optional, Any
+import logging
+import re
+import time
+from itertools import chain
+from typing import List, Dict, Iterable, Optional, Any, Tuple
+from botocore.config import Config as BotoConfig
 from botocore.exceptions import ClientError
+from aws_clients import get_client
+
+logger = logging.getLogger(__name__)
+
+# DynamoDB client settings: keep-alive connections reused across warm
+# invocations, adaptive retries and timeouts well inside the reply window
+DYNAMODB_CLIENT_CONFIG = BotoConfig(
+    retries={'mode': 'adaptive', 'max_attempts': 3},
+    connect_timeout=5,
+    read_timeout=10,
+    tcp_keepalive=True,
+    max_pool_connections=50
+)
+
+# Comma-style separators (with surrounding whitespace) for ingredient input
+INGREDIENT_COMMA_PATTERN = re.compile(r'\s*[、,]\s*')
+
+
+def split_ingredients_text(ingredients_text: str) -> List[str]:
+    """Split user input into ingredient names
+    
+    Comma-separated input ("鶏もも肉、ゆで卵") keeps spaces inside names;
+    otherwise the input is split on whitespace.
+    
+    Args:
+        ingredients_text: Ingredient list typed by the user
+        
+    Returns:
+        Non-empty ingredient names in input order
+    """
+    if '、' in ingredients_text or ',' in ingredients_text:
+        return [ing for ing in INGREDIENT_COMMA_PATTERN.split(ingredients_text.strip()) if ing]
+    return ingredients_text.split()
+
+
+# Per-user ingredient lists are cached in memory for a short time so
+# back-to-back commands skip the GetItem. Writes go through the cache; other
+# containers' writes become visible once the TTL expires.
+INGREDIENT_CACHE_TTL_SECONDS = 30.0
+INGREDIENT_CACHE_MAX_SIZE = 1024
+
+# BatchGetItem accepts at most 100 keys per request
+BATCH_GET_MAX_KEYS = 100
+
 
 class IngredientStorage:
     """Service for managing ingredient storage in DynamoDB"""
     
     def __init__(self):
         """Initialize DynamoDB client"""
-        self.dynamodb = boto3.client('dynamodb')
+        # Container-wide client from the shared boto3 session
+        self.dynamodb = get_client('dynamodb', config=DYNAMODB_CLIENT_CONFIG)
         self.table_name = 'DinnerBotIngredients'
+        self._cache: Dict[str, Tuple[float, List[str]]] = {}
+    
+    def _get_cached(self, user_id: str) -> Optional[List[str]]:
+        """Return a copy of the cached ingredient list if it is still fresh"""
+        cached = self._cache.get(user_id)
+        if cached is None:
+            return None
+        stored_at, ingredients = cached
+        if time.monotonic() - stored_at >= INGREDIENT_CACHE_TTL_SECONDS:
+            self._cache.pop(user_id, None)
+            return None
+        return list(ingredients)
+    
+    def _set_cached(self, user_id: str, ingredients: List[str]) -> None:
+        """Cache a user's ingredient list, evicting the oldest entry when full"""
+        self._cache.pop(user_id, None)
+        if len(self._cache) >= INGREDIENT_CACHE_MAX_SIZE:
+            self._cache.pop(next(iter(self._cache)), None)
+        self._cache[user_id] = (time.monotonic(), list(ingredients))
     
     def get_ingredients(self, user_id: str) -> List[str]:
         """Get stored ingredients for a user
@@ -23,6 +91,10 @@ class IngredientStorage:
         Returns:
             List of ingredients for the user
         """
+        cached = self._get_cached(user_id)
+        if cached is not None:
+            return cached
+        
         try:
             response = self.dynamodb.get_item(
                 TableName=self.table_name,
@@ -31,24 +103,69 @@ class IngredientStorage:
                 }
             )
             
-            if 'Item' in response and 'ingredients' in response['Item']:
-                # Extract ingredients from DynamoDB format
-                ingredients = []
-                if 'L' in response['Item']['ingredients']:
-                    for item in response['Item']['ingredients']['L']:
-                        if 'S' in item:
-                            ingredients.append(item['S'])
-                return ingredients
+            ingredients = self._parse_item(response.get('Item'))
+            self._set_cached(user_id, ingredients)
+            return ingredients
             
+        except ClientError:
+            logger.exception("get_ingredients failed user=%s", user_id)
             return []
-            
-        except ClientError as e:
-            print(f"Error getting ingredients for user {user_id}: {str(e)}")
+    
+    @staticmethod
+    def _parse_item(item: Optional[Dict[str, Any]]) -> List[str]:
+        """Extract the ingredient list from a DynamoDB item (None if missing)"""
+        if not item or 'ingredients' not in item:
             return []
+        stored = item['ingredients']
+        if 'SS' in stored:
+            return list(stored['SS'])
+        # Items written before the string set schema hold a list
+        return [entry['S'] for entry in stored.get('L', []) if 'S' in entry]
+    
+    def prefetch_ingredients(self, user_ids: Iterable[str]) -> None:
+        """Load several users' ingredients into the cache with BatchGetItem
+        
+        Users whose keys come back unprocessed or whose batch fails are left
+        uncached, so get_ingredients falls back to GetItem for them.
+        
+        Args:
+            user_ids: Users whose ingredients are about to be read
+        """
+        pending = [user_id for user_id in dict.fromkeys(user_ids) if self._get_cached(user_id) is None]
+        for start in range(0, len(pending), BATCH_GET_MAX_KEYS):
+            chunk = pending[start:start + BATCH_GET_MAX_KEYS]
+            try:
+                response = self.dynamodb.batch_get_item(
+                    RequestItems={
+                        self.table_name: {
+                            'Keys': [{'user_id': {'S': user_id}} for user_id in chunk]
+                        }
+                    }
+                )
+            except ClientError:
+                logger.exception("prefetch_ingredients failed users=%d", len(chunk))
+                continue
+            
+            items = {
+                item['user_id']['S']: item
+                for item in response.get('Responses', {}).get(self.table_name, [])
+            }
+            unprocessed = {
+                key['user_id']['S']
+                for key in response.get('UnprocessedKeys', {}).get(self.table_name, {}).get('Keys', [])
+            }
+            for user_id in chunk:
+                if user_id not in unprocessed:
+                    self._set_cached(user_id, self._parse_item(items.get(user_id)))
     
     def add_ingredients(self, user_id: str, new_ingredients: List[str]) -> bool:
         """Add ingredients to user's storage
         
+        On success the merged set returned by UpdateItem is cached, so a
+        following get_ingredients is served without a GetItem. If UpdateItem
+        returns no Attributes, the cache entry is popped instead and the
+        next get_ingredients call does a GetItem.
+        
         Args:
             user_id: Unique identifier for the user
             new_ingredients: List of ingredients to add
@@ -56,28 +173,103 @@ class IngredientStorage:
         Returns:
             True if successful, False otherwise
         """
+        # String sets must be non-empty and free of duplicates
+        unique_ingredients = list(dict.fromkeys(new_ingredients))
+        if not unique_ingredients:
+            return True
+        
         try:
-            # Get existing ingredients
-            current_ingredients = self.get_ingredients(user_id)
+            self._add_to_set(user_id, unique_ingredients)
+            return True
+            
+        except ClientError as e:
+            if e.response['Error']['Code'] == 'ValidationException':
+                # Possibly a legacy item stored as a list; ADD only works on sets
+                return self._migrate_and_add_ingredients(user_id, unique_ingredients)
+            logger.exception("add_ingredients failed user=%s", user_id)
+            return False
+    
+    def _add_to_set(self, user_id: str, ingredients: List[str]) -> None:
+        """Union ingredients into the stored string set and refresh the cache
+        
+        Args:
+            user_id: Unique identifier for the user
+            ingredients: Non-empty list of unique ingredients to add
+        """
+        # Union into the stored string set server-side in a single request;
+        # the merged set comes back so the cache stays current without a read
+        response = self.dynamodb.update_item(
+            TableName=self.table_name,
+            Key={
+                'user_id': {'S': user_id}
+            },
+            UpdateExpression='ADD ingredients :new_ingredients',
+            ExpressionAttributeValues={
+                ':new_ingredients': {'SS': ingredients}
+            },
+            ReturnValues='UPDATED_NEW'
+        )
+        merged = response.get('Attributes', {}).get('ingredients', {}).get('SS')
+        if merged is not None:
+            self._set_cached(user_id, merged)
+        else:
+            self._cache.pop(user_id, None)
+    
+    def _migrate_and_add_ingredients(self, user_id: str, new_ingredients: List[str]) -> bool:
+        """Rewrite a legacy list item as a string set including new ingredients
+        
+        Only items whose ingredients attribute is still a list are rewritten,
+        and the put is conditional on that, so a failed read or another
+        ValidationException cause never overwrites a stored set.
+        
+        Args:
+            user_id: Unique identifier for the user
+            new_ingredients: List of unique ingredients to add
             
-            # Merge with new ingredients (avoid duplicates)
-            all_ingredients = list(set(current_ingredients + new_ingredients))
+        Returns:
+            True if successful, False otherwise
+        """
+        self._cache.pop(user_id, None)
+        try:
+            # Read directly rather than via get_ingredients, which returns []
+            # on errors and would make the rewrite drop the stored ingredients
+            item = self.dynamodb.get_item(
+                TableName=self.table_name,
+                Key={
+                    'user_id': {'S': user_id}
+                },
+                ConsistentRead=True
+            ).get('Item')
+            if 'L' not in (item or {}).get('ingredients', {}):
+                logger.error("add_ingredients rejected for a non-list item user=%s", user_id)
+                return False
+            all_ingredients = list(dict.fromkeys(chain(self._parse_item(item), new_ingredients)))
             
-            # Save to DynamoDB
             self.dynamodb.put_item(
                 TableName=self.table_name,
                 Item={
                     'user_id': {'S': user_id},
-                    'ingredients': {
-                        'L': [{'S': ingredient} for ingredient in all_ingredients]
-                    }
+                    'ingredients': {'SS': all_ingredients}
+                },
+                ConditionExpression='attribute_type(ingredients, :list_type)',
+                ExpressionAttributeValues={
+                    ':list_type': {'S': 'L'}
                 }
             )
-            
+            self._set_cached(user_id, all_ingredients)
             return True
             
         except ClientError as e:
-            print(f"Error adding ingredients for user {user_id}: {str(e)}")
+            if e.response['Error']['Code'] != 'ConditionalCheckFailedException':
+                logger.exception("add_ingredients failed user=%s", user_id)
+                return False
+        
+        # Migrated concurrently; the item now holds a set that ADD can extend
+        try:
+            self._add_to_set(user_id, new_ingredients)
+            return True
+        except ClientError:
+            logger.exception("add_ingredients failed user=%s", user_id)
             return False
     
     def clear_ingredients(self, user_id: str) -> bool:
@@ -89,6 +281,7 @@ class IngredientStorage:
         Returns:
             True if successful, False otherwise
         """
+        self._cache.pop(user_id, None)
         try:
             self.dynamodb.delete_item(
                 TableName=self.table_name,
@@ -98,8 +291,8 @@ class IngredientStorage:
             )
             return True
             
-        except ClientError as e:
-            print(f"Error clearing ingredients for user {user_id}: {str(e)}")
+        except ClientError:
+            logger.exception("clear_ingredients failed user=%s", user_id)
             return False
     
     def format_ingredients_list(self, ingredients: List[str]) -> str:
@@ -114,8 +307,6 @@ class IngredientStorage:
         if not ingredients:
             return "🆕 冷蔵庫は空っぽです。`/dinner add 食材名` で食材を追加しましょう！"
         
-        formatted_list = "❄️ 冷蔵庫の食材:\n"
-        for idx, ingredient in enumerate(ingredients, 1):
-            formatted_list += f"{idx}. {ingredient}\n"
-        
-        return formatted_list.strip()
\ No newline at end of file
+        lines = ["❄️ 冷蔵庫の食材:"]
+        lines.extend(f"{idx}. {ingredient}" for idx, ingredient in enumerate(ingredients, 1))
+        return "\n".join(lines).strip()
\ No newline at end of file
@@ -1,17 +1,154 @@
 """
 LINE Bot handler for dinner suggestion bot
 """
-import json
+import base64
+import hashlib
+import hmac
+import logging
+import re
+from concurrent.futures import ThreadPoolExecutor, wait
 from typing import Dict, Any
-from linebot import LineBotApi, WebhookHandler
+from linebot import LineBotApi, WebhookParser
+from linebot.webhook import SignatureValidator
 from linebot.exceptions import InvalidSignatureError
+from linebot.http_client import RequestsHttpClient, RequestsHttpResponse
 from linebot.models import (
     MessageEvent, TextMessage, TextSendMessage, FlexSendMessage,
     BubbleContainer, BoxComponent, TextComponent
 )
 from config import config
-from recipe_service import RecipeService
-from ingredient_storage import IngredientStorage
+from http_clients import create_session, dumps
+from recipe_service import get_recipe_service
+from ingredient_storage import IngredientStorage, split_ingredients_text
+
+logger = logging.getLogger(__name__)
+logger.setLevel(config.log_level)
+
+
+# Fixed webhook response bodies, serialized once
+OK_BODY = dumps({'status': 'OK'})
+INVALID_SIGNATURE_BODY = dumps({'error': 'Invalid signature'})
+INTERNAL_ERROR_BODY = dumps({'error': 'Internal server error'})
+
+# Text commands: "追加 <ingredients>" / "add <ingredients>" plus exact keywords
+ADD_COMMAND_PATTERN = re.compile(r'^(?:追加|add)\s+(.*)$', re.DOTALL)
+EXACT_COMMANDS = {
+    '一覧': 'list', 'リスト': 'list', 'list': 'list',
+    '削除': 'clear', 'クリア': 'clear', 'clear': 'clear',
+    '保存済み': 'stored', '登録済み': 'stored', 'stored': 'stored',
+}
+
+# RecipeService error -> Japanese message shown in LINE
+ERROR_MESSAGES = {
+    "general": "申し訳ございません。エラーが発生しました。\nもう一度お試しください。",
+    "The service is currently experiencing high demand. Please try again in a moment.":
+        "申し訳ございません。現在アクセスが集中しています。\n少し時間をおいてからお試しください。",
+    "The AI model is preparing. Please wait a moment and try again.":
+        "申し訳ございません。AIモデルが準備中です。\nしばらくお待ちください。",
+    "An error occurred while processing your request.":
+        "申し訳ございません。レシピの生成中にエラーが発生しました。"
+}
+
+# Error replies are built once; SDK message models are not mutated when sent
+ERROR_REPLY_MESSAGES = {key: TextSendMessage(text=text) for key, text in ERROR_MESSAGES.items()}
+
+# Fixed replies of the ingredient commands, built once like the error replies
+NO_STORED_INGREDIENTS_MESSAGE = TextSendMessage(
+    text="登録済みの食材がありません。\n「追加 食材名」で食材を登録してください。"
+)
+THINKING_MESSAGE = TextSendMessage(text="🍳 メニューを考え中です…")
+ADD_USAGE_MESSAGE = TextSendMessage(text="追加する食材を指定してください。\n例: 追加 キャベツ 鶏肉")
+ADD_FAILED_MESSAGE = TextSendMessage(text="❌ 食材の追加に失敗しました。もう一度お試しください。")
+CLEAR_DONE_MESSAGE = TextSendMessage(text="🗑️ 登録済みの食材をすべて削除しました。")
+CLEAR_FAILED_MESSAGE = TextSendMessage(text="❌ 食材の削除に失敗しました。もう一度お試しください。")
+NO_RECIPES_MESSAGE = TextSendMessage(text="レシピが見つかりませんでした。もう一度お試しください。")
+
+# Length caps for model-generated Flex text (LINE rejects oversized messages)
+FLEX_MAX_NAME_LENGTH = 60
+FLEX_MAX_DESCRIPTION_LENGTH = 300
+
+
+def _truncate(text: str, limit: int) -> str:
+    """Strip text and cut it to limit characters, marking the cut with an ellipsis"""
+    text = text.strip()
+    if len(text) > limit:
+        return text[:limit - 1] + "…"
+    return text
+
+
+# Static parts of the recipe Flex bubble, built once per container.
+# as_json_dict() does not mutate components, so they can be shared.
+FLEX_HEADER = BoxComponent(
+    layout="vertical",
+    contents=[
+        TextComponent(
+            text="🍽️ 晩御飯メニュー提案",
+            weight="bold",
+            color="#FFFFFF",
+            size="lg"
+        )
+    ],
+    backgroundColor="#FF6B6B",
+    paddingAll="20px"
+)
+FLEX_INTRO = TextComponent(
+    text="本日のおすすめメニューです！",
+    size="sm",
+    color="#999999",
+    margin="md"
+)
+
+
+# Reply POSTs to the LINE API run here so the next webhook event can be
+# handled while a reply is in flight. handle_webhook waits for them before
+# returning, since Lambda freezes background threads after the response.
+REPLY_EXECUTOR = ThreadPoolExecutor(max_workers=8)
+REPLY_FLUSH_TIMEOUT_SECONDS = 10
+
+
+# Module-level session for LINE Messaging API calls, reused by warm Lambda
+# containers; the pool is sized to cover every REPLY_EXECUTOR worker
+_SESSION = create_session(pool_connections=1, pool_maxsize=10)
+
+
+class SessionHttpClient(RequestsHttpClient):
+    """LINE SDK HTTP client that sends requests through the shared session
+
+    The SDK's RequestsHttpClient calls requests.get/post directly, which
+    opens a new connection for every API call.
+    """
+    
+    def get(self, url, headers=None, params=None, stream=False, timeout=None):
+        response = _SESSION.get(url, headers=headers, params=params, stream=stream,
+                                timeout=timeout or self.timeout)
+        return RequestsHttpResponse(response)
+    
+    def post(self, url, headers=None, data=None, timeout=None):
+        response = _SESSION.post(url, headers=headers, data=data, timeout=timeout or self.timeout)
+        return RequestsHttpResponse(response)
+    
+    def delete(self, url, headers=None, data=None, timeout=None):
+        response = _SESSION.delete(url, headers=headers, data=data, timeout=timeout or self.timeout)
+        return RequestsHttpResponse(response)
+    
+    def put(self, url, headers=None, data=None, timeout=None):
+        response = _SESSION.put(url, headers=headers, data=data, timeout=timeout or self.timeout)
+        return RequestsHttpResponse(response)
+
+
+class PrekeyedSignatureValidator(SignatureValidator):
+    """X-Line-Signature validator that keys its HMAC once per container"""
+    
+    def __init__(self, channel_secret: str):
+        super().__init__(channel_secret)
+        # Each request works on a copy so the ipad/opad setup is not repeated
+        self._hmac = hmac.new(self.channel_secret, digestmod=hashlib.sha256)
+    
+    def validate(self, body: str, signature: str) -> bool:
+        """Check the base64 HMAC-SHA256 signature of a webhook body"""
+        mac = self._hmac.copy()
+        mac.update(body.encode('utf-8'))
+        return hmac.compare_digest(signature.encode('utf-8'), base64.b64encode(mac.digest()))
 
 
 class LineBotHandler:
@@ -25,23 +162,83 @@ class LineBotHandler:
             raise ValueError(f"Invalid LINE configuration: {error}")
         
         # Initialize LINE SDK
-        self.line_bot_api = LineBotApi(config.line_channel_access_token)
-        self.webhook_handler = WebhookHandler(config.line_channel_secret)
-        self.recipe_service = RecipeService()
+        self.line_bot_api = LineBotApi(config.line_channel_access_token, http_client=SessionHttpClient)
+        self.webhook_parser = WebhookParser(config.line_channel_secret)
+        self.webhook_parser.signature_validator = PrekeyedSignatureValidator(config.line_channel_secret)
+        self.recipe_service = get_recipe_service()
         self.ingredient_storage = IngredientStorage()
-        
-        # Register message handler
-        self.webhook_handler.add(MessageEvent, message=TextMessage)(self._handle_text_message)
+        self._pending_replies = []
     
     def handle_webhook(self, body: str, signature: str) -> Dict[str, Any]:
         """Handle LINE webhook request"""
         try:
-            self.webhook_handler.handle(body, signature)
-            return {'statusCode': 200, 'body': json.dumps({'status': 'OK'})}
+            # The signature is checked and the body parsed once; the events
+            # are dispatched here rather than through a WebhookHandler
+            events = self.webhook_parser.parse(body, signature)
+            text_events = [
+                event for event in events
+                if isinstance(event, MessageEvent) and isinstance(event.message, TextMessage)
+            ]
+            # LINE may batch several events into one POST; load the stored
+            # ingredients they will read in a single BatchGetItem
+            if len(text_events) > 1:
+                self._prefetch_ingredients(text_events)
+            for event in text_events:
+                self._handle_text_message(event)
+            return {'statusCode': 200, 'body': OK_BODY}
         except InvalidSignatureError:
-            return {'statusCode': 400, 'body': json.dumps({'error': 'Invalid signature'})}
-        except Exception as e:
-            return {'statusCode': 500, 'body': json.dumps({'error': 'Internal server error'})}
+            return {'statusCode': 400, 'body': INVALID_SIGNATURE_BODY}
+        except Exception:
+            logger.exception("LINE webhook handling failed")
+            return {'statusCode': 500, 'body': INTERNAL_ERROR_BODY}
+        finally:
+            self._flush_replies()
+    
+    def _prefetch_ingredients(self, events: list):
+        """Batch-read ingredients for the list/stored commands among text message events"""
+        user_ids = [
+            event.source.user_id for event in events
+            if EXACT_COMMANDS.get(event.message.text) in ('list', 'stored')
+            and getattr(event.source, 'user_id', None)
+        ]
+        if len(user_ids) > 1:
+            self.ingredient_storage.prefetch_ingredients(user_ids)
+    
+    def verify_signature(self, body: str, signature: str) -> bool:
+        """Check the X-Line-Signature of a webhook body without handling its events"""
+        return self.webhook_parser.signature_validator.validate(body, signature)
+    
+    def _reply(self, reply_token: str, message):
+        """Send a reply message on the reply executor without blocking event handling"""
+        future = REPLY_EXECUTOR.submit(self.line_bot_api.reply_message, reply_token, message)
+        self._pending_replies.append((reply_token, message, future))
+    
+    def _flush_replies(self):
+        """Wait for in-flight replies so none are frozen with the Lambda container
+        
+        A failed reply (e.g. a Flex message rejected with 400) leaves its
+        reply token unused, so the general error message is sent on it instead.
+        """
+        pending, self._pending_replies = self._pending_replies, []
+        if not pending:
+            return
+        done, not_done = wait([future for _, _, future in pending], timeout=REPLY_FLUSH_TIMEOUT_SECONDS)
+        for reply_token, message, future in pending:
+            if future not in done:
+                continue
+            error = future.exception()
+            if error is None:
+                continue
+            logger.error("LINE reply failed: %s", error, exc_info=error)
+            # An error reply that failed is not retried with another one
+            if any(message is error_message for error_message in ERROR_REPLY_MESSAGES.values()):
+                continue
+            try:
+                self.line_bot_api.reply_message(reply_token, self._create_error_message("general"))
+            except Exception:
+                logger.exception("LINE error reply failed")
+        if not_done:
+            logger.error("%d LINE replies did not finish in time", len(not_done))
     
     def _handle_text_message(self, event: MessageEvent):
         """Handle text message from LINE user"""
@@ -50,78 +247,113 @@ class LineBotHandler:
             user_id = event.source.user_id
             
             # Parse commands
-            if user_message.startswith('追加 ') or user_message.startswith('add '):
+            add_match = ADD_COMMAND_PATTERN.match(user_message)
+            if add_match:
                 # Add ingredients
-                ingredients_text = user_message[3:].strip()
+                ingredients_text = add_match.group(1).strip()
                 self._handle_add_ingredients(event, user_id, ingredients_text)
                 return
-            elif user_message in ['一覧', 'リスト', 'list']:
+            
+            command = EXACT_COMMANDS.get(user_message)
+            if command == 'list':
                 # List ingredients
                 self._handle_list_ingredients(event, user_id)
                 return
-            elif user_message in ['削除', 'クリア', 'clear']:
+            elif command == 'clear':
                 # Clear ingredients
                 self._handle_clear_ingredients(event, user_id)
                 return
-            elif user_message in ['保存済み', '登録済み', 'stored']:
+            elif command == 'stored':
                 # Use stored ingredients for recipe
                 stored_ingredients = self.ingredient_storage.get_ingredients(user_id)
                 if stored_ingredients:
                     user_message = ' '.join(stored_ingredients)
                 else:
-                    self.line_bot_api.reply_message(
+                    self._reply(
                         event.reply_token,
-                        TextSendMessage(text="登録済みの食材がありません。\n「追加 食材名」で食材を登録してください。")
+                        NO_STORED_INGREDIENTS_MESSAGE
                     )
                     return
             
+            # With Bedrock streaming, acknowledge right away and push the
+            # suggestions once the stream completes
+            if getattr(self.recipe_service, 'streaming', False):
+                self._reply_with_streamed_recipes(event, user_message)
+                return
+            
             # Generate recipe suggestions
             result = self.recipe_service.generate_recipe(user_message)
             
             if not result['success']:
-                self.line_bot_api.reply_message(
+                self._reply(
                     event.reply_token,
                     self._create_error_message(result.get('error', 'An error occurred'))
                 )
                 return
             
             # Send response
-            if config.use_flex_message and result['recipes']:
-                flex_message = self._create_flex_message(result['recipes'])
-                self.line_bot_api.reply_message(event.reply_token, flex_message)
-            else:
-                text_response = self._format_recipes_as_text(result['recipes'])
-                self.line_bot_api.reply_message(
-                    event.reply_token,
-                    TextSendMessage(text=text_response)
-                )
-                
-        except Exception as e:
-            try:
-                self.line_bot_api.reply_message(
-                    event.reply_token,
-                    self._create_error_message("general")
-                )
-            except:
-                pass  # Reply token might be expired
+            self._reply(event.reply_token, self._create_recipes_message(result['recipes']))
+            
+        except Exception:
+            logger.exception("Recipe reply failed")
+            self._reply(
+                event.reply_token,
+                self._create_error_message("general")
+            )
+    
+    def _reply_with_streamed_recipes(self, event: MessageEvent, user_message: str):
+        """Reply with a progress message, then push recipes parsed from the Bedrock stream
+        
+        The reply token is spent on the immediate acknowledgement, so the
+        user sees a response within a second instead of after the full
+        generation. The recipes are sent as a single push message to keep
+        push quota usage at one message per request.
+        """
+        self._reply(
+            event.reply_token,
+            THINKING_MESSAGE
+        )
+        
+        source = event.source
+        push_to = getattr(source, 'group_id', None) or getattr(source, 'room_id', None) or source.user_id
+        try:
+            recipes = list(self.recipe_service.stream_recipes(user_message))
+        except Exception:
+            logger.exception("Streaming recipe generation failed")
+            self.line_bot_api.push_message(push_to, self._create_error_message("general"))
+            return
+        
+        self.line_bot_api.push_message(push_to, self._create_recipes_message(recipes))
+    
+    def _create_recipes_message(self, recipes: list):
+        """Pick the reply for generated recipes: prebuilt notice, Flex or plain text"""
+        if not recipes:
+            return NO_RECIPES_MESSAGE
+        if config.use_flex_message:
+            return self._create_flex_message(recipes)
+        return TextSendMessage(text=self._format_recipes_as_text(recipes))
     
     def _create_flex_message(self, recipes: list) -> FlexSendMessage:
         """Create Flex Message for recipe display"""
         menu_items = []
         
         for i, recipe in enumerate(recipes):
+            description = _truncate(recipe['description'], FLEX_MAX_DESCRIPTION_LENGTH)
             menu_items.append(
                 TextComponent(
-                    text=f"{recipe['number']}. {recipe['name']}",
+                    text=f"{recipe['number']}. {_truncate(recipe['name'], FLEX_MAX_NAME_LENGTH)}",
                     size="md",
                     weight="bold",
                     color="#1DB446",
                     margin="md" if i > 0 else None
                 )
             )
+            if not description:
+                # LINE rejects empty text components
+                continue
             menu_items.append(
                 TextComponent(
-                    text=recipe['description'],
+                    text=description,
                     size="sm",
                     color="#666666",
                     wrap=True,
@@ -130,30 +362,10 @@ class LineBotHandler:
             )
         
         bubble = BubbleContainer(
-            header=BoxComponent(
-                layout="vertical",
-                contents=[
-                    TextComponent(
-                        text="🍽️ 晩御飯メニュー提案",
-                        weight="bold",
-                        color="#FFFFFF",
-                        size="lg"
-                    )
-                ],
-                backgroundColor="#FF6B6B",
-                paddingAll="20px"
-            ),
+            header=FLEX_HEADER,
             body=BoxComponent(
                 layout="vertical",
-                contents=[
-                    TextComponent(
-                        text="本日のおすすめメニューです！",
-                        size="sm",
-                        color="#999999",
-                        margin="md"
-                    ),
-                    *menu_items
-                ],
+                contents=[FLEX_INTRO, *menu_items],
                 paddingAll="20px"
             )
         )
@@ -162,29 +374,19 @@ class LineBotHandler:
     
     def _create_error_message(self, error_type: str = "general") -> TextSendMessage:
         """Create error message for LINE"""
-        error_messages = {
-            "general": "申し訳ございません。エラーが発生しました。\nもう一度お試しください。",
-            "The service is currently experiencing high demand. Please try again in a moment.": 
-                "申し訳ございません。現在アクセスが集中しています。\n少し時間をおいてからお試しください。",
-            "The AI model is preparing. Please wait a moment and try again.":
-                "申し訳ございません。AIモデルが準備中です。\nしばらくお待ちください。",
-            "An error occurred while processing your request.":
-                "申し訳ございません。レシピの生成中にエラーが発生しました。"
-        }
-        message = error_messages.get(error_type, error_messages["general"])
-        return TextSendMessage(text=message)
+        return ERROR_REPLY_MESSAGES.get(error_type, ERROR_REPLY_MESSAGES["general"])
     
     def _format_recipes_as_text(self, recipes: list) -> str:
         """Format recipes as plain text"""
         if not recipes:
             return "レシピが見つかりませんでした。もう一度お試しください。"
         
-        text = "🍽️ メニュー提案\n\n"
-        for recipe in recipes:
-            text += f"{recipe['number']}. {recipe['name']}\n"
-            text += f"   - {recipe['description']}\n\n"
-        
-        return text.strip()
+        parts = ["🍽️ メニュー提案\n\n"]
+        parts.extend(
+            f"{recipe['number']}. {recipe['name']}\n   - {recipe['description']}\n\n"
+            for recipe in recipes
+        )
+        return ''.join(parts).strip()
     
     def _handle_add_ingredients(self, event: MessageEvent, user_id: str, ingredients_text: str):
         """Handle adding ingredients to storage
@@ -195,20 +397,14 @@ class LineBotHandler:
             ingredients_text: Text containing ingredients to add
         """
         if not ingredients_text:
-            self.line_bot_api.reply_message(
+            self._reply(
                 event.reply_token,
-                TextSendMessage(text="追加する食材を指定してください。\n例: 追加 キャベツ 鶏肉")
+                ADD_USAGE_MESSAGE
             )
             return
         
         # Parse ingredients (comma or space separated)
-        ingredients = []
-        if '、' in ingredients_text or ',' in ingredients_text:
-            # Handle comma-separated
-            ingredients = [ing.strip() for ing in ingredients_text.replace('、', ',').split(',') if ing.strip()]
-        else:
-            # Handle space-separated
-            ingredients = ingredients_text.split()
+        ingredients = split_ingredients_text(ingredients_text)
         
         # Add to storage
         success = self.ingredient_storage.add_ingredients(user_id, ingredients)
@@ -218,14 +414,14 @@ class LineBotHandler:
             all_ingredients = self.ingredient_storage.get_ingredients(user_id)
             formatted_list = self.ingredient_storage.format_ingredients_list(all_ingredients)
             
-            self.line_bot_api.reply_message(
+            self._reply(
                 event.reply_token,
                 TextSendMessage(text=f"✅ 食材を追加しました！\n\n{formatted_list}")
             )
         else:
-            self.line_bot_api.reply_message(
+            self._reply(
                 event.reply_token,
-                TextSendMessage(text="❌ 食材の追加に失敗しました。もう一度お試しください。")
+                ADD_FAILED_MESSAGE
             )
     
     def _handle_list_ingredients(self, event: MessageEvent, user_id: str):
@@ -238,7 +434,7 @@ class LineBotHandler:
         ingredients = self.ingredient_storage.get_ingredients(user_id)
         formatted_list = self.ingredient_storage.format_ingredients_list(ingredients)
         
-        self.line_bot_api.reply_message(
+        self._reply(
             event.reply_token,
             TextSendMessage(text=formatted_list)
         )
@@ -253,12 +449,12 @@ class LineBotHandler:
         success = self.ingredient_storage.clear_ingredients(user_id)
         
         if success:
-            self.line_bot_api.reply_message(
+            self._reply(
                 event.reply_token,
-                TextSendMessage(text="🗑️ 登録済みの食材をすべて削除しました。")
+                CLEAR_DONE_MESSAGE
             )
         else:
-            self.line_bot_api.reply_message(
+            self._reply(
                 event.reply_token,
-                TextSendMessage(text="❌ 食材の削除に失敗しました。もう一度お試しください。")
+                CLEAR_FAILED_MESSAGE
             )
\ No newline at end of file
@@ -1,17 +1,332 @@
 """
-Recipe service for generating dinner suggestions using Claude 3.5 Sonnet
+Recipe service for generating dinner suggestions using Claude on AWS Bedrock
 Handles both ingredient-based and mood-based recipe generation
 Supports both AWS Bedrock and Claude SDK backends
 """
 import json
+import logging
 import re
 import os
-import boto3
-from typing import Dict, Any, List
+import hashlib
+import threading
+import time
+import unicodedata
+import uuid
+from collections import OrderedDict
+from functools import lru_cache
+from typing import Dict, Any, Iterator, List, Optional, Tuple
+from botocore.config import Config as BotoConfig
 from botocore.exceptions import ClientError
 from config import config
+from aws_clients import get_client
 from claude_sdk_client import ClaudeSDKClient
 
+logger = logging.getLogger(__name__)
+logger.setLevel(config.log_level)
+
+try:
+    import ahocorasick
+except ImportError:
+    ahocorasick = None
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+# Static instruction blocks shared by every request. Keeping them byte-identical
+# lets Bedrock serve them from the prompt cache when BEDROCK_PROMPT_CACHING is on.
+MOOD_PROMPT_PREFIX = """あなたはプロの料理アドバイザーです。
+ユーザーの今の気分や食べたいものの希望に基づいて、ぴったりの晩御飯メニューを2-3個提案してください。
+
+提案フォーマット:
+1. [メニュー名]
+   - 簡単な説明
+
+2. [メニュー名]  
+   - 簡単な説明
+
+メニュー名は具体的で、説明は2-3文で記載してください。"""
+
+INGREDIENT_PROMPT_PREFIX = """あなたは優秀な料理アドバイザーです。
+冷蔵庫にある食材を中心に使って、美味しい晩御飯のメニューを2-3個提案してください。
+
+**重要な指示:**
+1. 主に冷蔵庫の食材を活用したメニューを考案
+2. 足りない調味料や小工材がある場合は「追加で必要な材料」として明記
+3. 家庭で作りやすく、実用的なレシピを提案
+4. 冷蔵庫の食材を無駄なく使えるメニューを優先
+
+提案フォーマット:
+1. [メニュー名]
+   - 簡単な説明（1-2文）
+   - 追加で必要な材料: （もしあれば）
+
+2. [メニュー名]
+   - 簡単な説明（1-2文）  
+   - 追加で必要な材料: （もしあれば）
+
+3. [メニュー名]
+   - 簡単な説明（1-2文）
+   - 追加で必要な材料: （もしあれば）
+
+メニュー名は具体的で、実際に作れるものを提案してください。"""
+
+# Recipe response parsing patterns (compiled once per container)
+# "N. [name]" title line: number and name captured by one match. A digit
+# right after the dot is a decimal ("1.5倍"), not a title
+RECIPE_TITLE_PATTERN = re.compile(r'^(\d+)\.(?!\d)\s*[\[\]]*(.*)')
+ADDITIONAL_PREFIX_PATTERN = re.compile(r'^追加で必要(?:な材料)?\s*[:：]?\s*')
+
+# Start of the next numbered recipe ("\n2.") in a streamed response, matching
+# only title lines RECIPE_TITLE_PATTERN accepts; the character after the dot
+# must have arrived so a decimal like "1.5" is never split off
+RECIPE_BOUNDARY_PATTERN = re.compile(r'\n\s*\d+\.(?=\D)')
+
+MOOD_INPUT_LABEL = "ユーザーの気分・希望: "
+INGREDIENT_INPUT_LABEL = "冷蔵庫の食材: "
+
+
+USER_TEXT_SLOT = "__USER_TEXT__"
+
+
+def _compile_request_affixes(prompt_prefix: str, input_label: str,
+                             max_tokens: int, temperature: float) -> Tuple[bytes, bytes]:
+    """Serialize a Bedrock request body to UTF-8 once and split it around the user text"""
+    system_block = {"type": "text", "text": prompt_prefix}
+    # Models without prompt caching reject cache_control, so it is opt-in
+    if config.bedrock_prompt_caching:
+        system_block["cache_control"] = {"type": "ephemeral"}
+    body = {
+        "anthropic_version": "bedrock-2023-05-31",
+        "max_tokens": max_tokens,
+        # Static instructions go in the system prompt so the cached prefix
+        # ends before the first message; the user turn carries only the input
+        "system": [system_block],
+        "messages": [
+            {
+                "role": "user",
+                "content": [
+                    {
+                        "type": "text",
+                        "text": input_label + USER_TEXT_SLOT
+                    }
+                ]
+            }
+        ],
+        "temperature": temperature,
+        "top_p": 0.95
+    }
+    serialized = json.dumps(body, ensure_ascii=False).encode('utf-8')
+    before, after = serialized.split(USER_TEXT_SLOT.encode('utf-8'), 1)
+    return before, after
+
+
+@lru_cache(maxsize=32)
+def _request_body_affixes(is_mood_based: bool, max_tokens: int, temperature: float) -> Tuple[bytes, bytes]:
+    """Get the pre-rendered request body bytes surrounding the user input"""
+    if is_mood_based:
+        return _compile_request_affixes(MOOD_PROMPT_PREFIX, MOOD_INPUT_LABEL, max_tokens, temperature)
+    return _compile_request_affixes(INGREDIENT_PROMPT_PREFIX, INGREDIENT_INPUT_LABEL, max_tokens, temperature)
+
+
+# Pre-render the default request shapes at import (cold start) rather than on the first request
+for _is_mood_based in (True, False):
+    _request_body_affixes(_is_mood_based, 1000, config.bedrock_temperature)
+
+# Token budgeting. No tokenizer ships in the Lambda package, so counts are
+# estimated: ~1 token per non-ASCII (Japanese) character, ~4 ASCII chars per token.
+MODEL_CONTEXT_TOKENS = 200000
+TOKEN_BUDGET_MARGIN = 64
+
+
+def estimate_tokens(text: str) -> int:
+    """Roughly estimate the Claude token count of text"""
+    ascii_chars = len(text.encode('ascii', 'ignore'))
+    return (len(text) - ascii_chars) + (ascii_chars + 3) // 4
+
+
+# The static prefixes are counted once; per request only the user input is
+PROMPT_PREFIX_TOKENS = {
+    True: estimate_tokens(MOOD_PROMPT_PREFIX + MOOD_INPUT_LABEL),
+    False: estimate_tokens(INGREDIENT_PROMPT_PREFIX + INGREDIENT_INPUT_LABEL)
+}
+
+
+def _budget_max_tokens(user_input: str, is_mood_based: bool, max_tokens: int) -> int:
+    """Clamp max_tokens so prompt plus completion fits in the model context window"""
+    available = (MODEL_CONTEXT_TOKENS - PROMPT_PREFIX_TOKENS[is_mood_based]
+                 - estimate_tokens(user_input) - TOKEN_BUDGET_MARGIN)
+    return max(1, min(max_tokens, available))
+
+# Keywords used to classify input as mood-based or ingredient-based
+MOOD_KEYWORDS = (
+    'さっぱり', 'あっさり', 'こってり', 'ガッツリ', 'ヘルシー',
+    '夏バテ', '疲れ', 'スタミナ', '温まる', '冷たい', '辛い', '甘い',
+    '気分', '食べたい', '系', '元気', '軽め', '重め', '食欲'
+)
+INGREDIENT_INDICATORS = ('と', 'や', '、', 'の', 'が残って', 'がある')
+
+_MOOD = 0
+_INGREDIENT = 1
+
+
+def _build_keyword_automaton():
+    """Build an Aho-Corasick automaton over all classification keywords"""
+    if ahocorasick is None:
+        return None
+    automaton = ahocorasick.Automaton()
+    for keyword in MOOD_KEYWORDS:
+        automaton.add_word(keyword, (_MOOD, keyword))
+    for indicator in INGREDIENT_INDICATORS:
+        automaton.add_word(indicator, (_INGREDIENT, indicator))
+    automaton.make_automaton()
+    return automaton
+
+
+# Single-pass matcher for _is_mood_based_input (None if pyahocorasick is missing)
+KEYWORD_AUTOMATON = _build_keyword_automaton()
+
+
+# Whole-token lookup for inputs made only of mood keywords ("さっぱり", "ガッツリ 系")
+MOOD_KEYWORD_SET = frozenset(MOOD_KEYWORDS)
+# Separators folded to spaces before tokenizing, in a single translate() pass
+TOKEN_SEPARATOR_TABLE = str.maketrans({'、': ' ', ',': ' '})
+
+# Fallback single-pass matcher when pyahocorasick is missing (longest keywords first)
+KEYWORD_PATTERN = re.compile('|'.join(
+    re.escape(keyword)
+    for keyword in sorted(MOOD_KEYWORDS + INGREDIENT_INDICATORS, key=len, reverse=True)
+))
+
+
+def _iter_keywords(user_input: str):
+    """Yield (kind, keyword) for each classification keyword found in the input"""
+    if KEYWORD_AUTOMATON is not None:
+        for _, found in KEYWORD_AUTOMATON.iter(user_input):
+            yield found
+        return
+    for match in KEYWORD_PATTERN.finditer(user_input):
+        keyword = match.group()
+        yield (_MOOD if keyword in MOOD_KEYWORD_SET else _INGREDIENT), keyword
+
+
+@lru_cache(maxsize=4096)
+def _is_mood_based_input(user_input: str) -> bool:
+    """Determine if input is mood-based or ingredient-based"""
+    # Fold width variants once (e.g. half-width ｶﾞｯﾂﾘ -> ガッツリ) so a single
+    # scan over the keyword table covers them
+    user_input = unicodedata.normalize('NFKC', user_input)
+    
+    # Fast path: every token is a mood keyword. Keywords contain no ingredient
+    # indicators, so the substring scan below could only return True here.
+    tokens = user_input.translate(TOKEN_SEPARATOR_TABLE).split()
+    if tokens and MOOD_KEYWORD_SET.issuperset(tokens):
+        return True
+    
+    # One pass over the input; two distinct ingredient indicators win over
+    # any mood keyword
+    has_mood_keyword = False
+    found_indicators = set()
+    for kind, keyword in _iter_keywords(user_input):
+        if kind == _MOOD:
+            has_mood_keyword = True
+        else:
+            found_indicators.add(keyword)
+            if len(found_indicators) >= 2:
+                return False
+    return has_mood_keyword
+
+
+# Bedrock runtime client settings (the client itself is cached in aws_clients).
+# Reusing the client keeps its HTTPS connection pool alive between invocations.
+# Adaptive retries pace requests client-side under throttling; with at most one
+# retry and an 18s read timeout a throttled call fails while the LINE reply
+# token is still valid instead of waiting out the default backoff.
+BEDROCK_CLIENT_CONFIG = BotoConfig(
+    retries={'mode': 'adaptive', 'max_attempts': 2},
+    connect_timeout=2,
+    read_timeout=18,
+    tcp_keepalive=True,
+    max_pool_connections=50
+)
+
+
+def get_bedrock_client(region_name: str):
+    """Get or create the shared Bedrock runtime client for a region"""
+    return get_client('bedrock-runtime', region_name, BEDROCK_CLIENT_CONFIG)
+
+
+# In-process response cache (survives across warm Lambda invocations).
+# Only used for low temperatures; high-temperature output is meant to vary.
+RESPONSE_CACHE_MAX_SIZE = 512
+RESPONSE_CACHE_MAX_TEMPERATURE = 0.3
+_response_cache: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+_response_cache_lock = threading.Lock()
+
+
+# Separators used when normalizing input for the response cache
+INPUT_SEPARATOR_PATTERN = re.compile(r'\s*[,、]\s*')
+WHITESPACE_PATTERN = re.compile(r'\s+')
+# Ingredient lists are also joined with particles ("キャベツと鶏肉", "卵や豆腐")
+INGREDIENT_SEPARATOR_PATTERN = re.compile(r'\s*(?:[,、・]|と|や)\s*|\s+')
+# Sentence punctuation dropped from cache keys ("さっぱり！" == "さっぱり");
+# applied after NFKC, which folds ！/？ to their ASCII forms
+PUNCTUATION_TABLE = str.maketrans('', '', '。!?')
+
+
+def normalize_input(user_input: str) -> str:
+    """Normalize user input so trivially different strings share a cache key"""
+    text = unicodedata.normalize('NFKC', user_input).translate(PUNCTUATION_TABLE).strip().lower()
+    if ',' in text or '、' in text:
+        tokens = [token for token in INPUT_SEPARATOR_PATTERN.split(text) if token]
+        return ','.join(sorted(tokens))
+    return WHITESPACE_PATTERN.sub(' ', text)
+
+
+def normalize_ingredient_input(user_input: str) -> str:
+    """Normalize an ingredient list so order, separators and duplicates don't matter
+
+    "キャベツと鶏肉", "鶏肉、キャベツ" and "鶏肉 キャベツ" all map to the same key.
+    """
+    text = unicodedata.normalize('NFKC', user_input).translate(PUNCTUATION_TABLE).strip().lower()
+    tokens = {token for token in INGREDIENT_SEPARATOR_PATTERN.split(text) if token}
+    return ','.join(sorted(tokens))
+
+
+def _response_cache_key(user_input: str, input_type: str, model_id: str,
+                        temperature: float, max_tokens: int) -> str:
+    """Build the response cache key from normalized input and generation settings"""
+    if input_type == 'ingredient':
+        normalized = normalize_ingredient_input(user_input)
+    else:
+        normalized = normalize_input(user_input)
+    raw = f"{input_type}|{normalized}|{model_id}|{round(temperature, 1)}|{max_tokens}"
+    return hashlib.sha1(raw.encode('utf-8')).hexdigest()
+
+
+def _get_cached_response(key: str) -> Optional[Dict[str, Any]]:
+    """Return a cached result and mark it as recently used"""
+    with _response_cache_lock:
+        cached = _response_cache.get(key)
+        if cached is not None:
+            _response_cache.move_to_end(key)
+        return cached
+
+
+def _put_cached_response(key: str, result: Dict[str, Any]) -> None:
+    """Store a result, evicting the least recently used entry when full"""
+    with _response_cache_lock:
+        _response_cache[key] = result
+        _response_cache.move_to_end(key)
+        if len(_response_cache) > RESPONSE_CACHE_MAX_SIZE:
+            _response_cache.popitem(last=False)
+
+
+# Bedrock rejects batch inference jobs with fewer records than this
+BATCH_MIN_RECORDS = 100
+
 
 class RecipeService:
     """Service for generating recipe suggestions using AWS Bedrock Claude"""
@@ -21,23 +336,19 @@ class RecipeService:
         # Check if we should use Claude SDK
         self.use_claude_sdk = os.environ.get('USE_CLAUDE_SDK', 'false').lower() == 'true'
         
+        self.temperature = config.bedrock_temperature
+        
         if self.use_claude_sdk:
             self.claude_sdk_client = ClaudeSDKClient()
+            # Cache entries are namespaced per backend
+            self.model_id = 'claude-sdk'
             print("RecipeService: Using Claude SDK backend")
         else:
-            self.client = boto3.client(
-                service_name='bedrock-runtime',
-                region_name=config.aws_region
-            )
+            self.client = get_bedrock_client(config.aws_region)
             self.model_id = config.bedrock_model_id
+            self.latency_optimized = config.bedrock_latency_optimized
+            self.streaming = config.bedrock_streaming
             print("RecipeService: Using AWS Bedrock backend")
-        
-        # Mood keywords for classification
-        self.mood_keywords = [
-            'さっぱり', 'あっさり', 'こってり', 'ガッツリ', 'ヘルシー',
-            '夏バテ', '疲れ', 'スタミナ', '温まる', '冷たい', '辛い', '甘い',
-            '気分', '食べたい', '系', '元気', '軽め', '重め', '食欲'
-        ]
     
     def generate_recipe(self, user_input: str, max_tokens: int = 1000) -> Dict[str, Any]:
         """
@@ -50,33 +361,51 @@ class RecipeService:
         Returns:
             Dict with success, recipes, error, and input_type
         """
+        # Determine input type
+        is_mood_based = _is_mood_based_input(user_input)
+        input_type = 'mood' if is_mood_based else 'ingredient'
+        
+        # Common inputs repeat across users; serve them without a model call
+        cache_key = None
+        if self.temperature <= RESPONSE_CACHE_MAX_TEMPERATURE:
+            cache_key = _response_cache_key(user_input, input_type, self.model_id,
+                                            self.temperature, max_tokens)
+            cached = _get_cached_response(cache_key)
+            if cached is not None:
+                logger.debug("Response cache hit")
+                return {**cached, 'recipes': [dict(recipe) for recipe in cached['recipes']]}
+        
         # Use Claude SDK if enabled
         if self.use_claude_sdk:
             channel = os.environ.get('CHANNEL_TYPE', 'unknown')
             user_id = os.environ.get('USER_ID', 'unknown')
-            return self.claude_sdk_client.generate_recipe(user_input, channel, user_id)
+            result = self.claude_sdk_client.generate_recipe(user_input, channel, user_id)
+            if cache_key and result.get('success') and result.get('recipes'):
+                _put_cached_response(cache_key, {**result, 'recipes': [dict(recipe) for recipe in result['recipes']]})
+            return result
         
         # Otherwise use Bedrock
         try:
-            # Determine input type
-            is_mood_based = self._is_mood_based_input(user_input)
-            input_type = 'mood' if is_mood_based else 'ingredient'
-            
-            # Create appropriate prompt
-            prompt = self._create_prompt(user_input, is_mood_based)
             
-            # Generate response
-            response = self._invoke_claude(prompt, max_tokens)
+            # Create request body with the appropriate prompt
+            request_body = self._create_request_body(user_input, is_mood_based, max_tokens)
             
-            # Parse recipes
-            recipes = self._parse_recipes(response)
+            # Generate and parse response
+            if self.streaming:
+                recipes = list(self._stream_recipes(request_body))
+            else:
+                response = self._invoke_claude(request_body)
+                recipes = self._parse_recipes(response)
             
-            return {
+            result = {
                 'success': True,
                 'recipes': recipes,
                 'error': None,
                 'input_type': input_type
             }
+            if cache_key and recipes:
+                _put_cached_response(cache_key, {**result, 'recipes': [dict(recipe) for recipe in recipes]})
+            return result
             
         except ClientError as e:
             error_code = e.response['Error']['Code']
@@ -95,177 +424,264 @@ class RecipeService:
                 'input_type': 'ingredient'
             }
     
-    def _is_mood_based_input(self, user_input: str) -> bool:
-        """Determine if input is mood-based or ingredient-based"""
-        input_lower = user_input.lower()
-        has_mood_keyword = any(keyword in input_lower for keyword in self.mood_keywords)
-        ingredient_indicators = ['と', 'や', '、', 'の', 'が残って', 'がある']
-        ingredient_count = sum(1 for indicator in ingredient_indicators if indicator in user_input)
+    def generate_recipe_batch(self, user_inputs: List[str], max_tokens: int = 1000,
+                              poll_interval: int = 60, timeout: int = 86400) -> List[Dict[str, Any]]:
+        """
+        Generate recipe suggestions for many inputs via Bedrock batch inference
+        
+        Intended for offline/backfill jobs only (Bedrock requires at least
+        BATCH_MIN_RECORDS records per job and jobs take minutes to hours);
+        interactive LINE/Slack requests must keep using generate_recipe.
+        
+        Args:
+            user_inputs: List of user inputs (ingredients or mood)
+            max_tokens: Maximum tokens for each generation
+            poll_interval: Seconds between job status checks
+            timeout: Maximum seconds to wait for the job to finish
+            
+        Returns:
+            List of result dicts in the same order as user_inputs
+        """
+        if len(user_inputs) < BATCH_MIN_RECORDS:
+            raise ValueError(f"Batch inference needs at least {BATCH_MIN_RECORDS} inputs, got {len(user_inputs)}")
+        
+        bucket = config.bedrock_batch_bucket
+        role_arn = config.bedrock_batch_role_arn
+        if not bucket or not role_arn:
+            raise ValueError("BEDROCK_BATCH_BUCKET and BEDROCK_BATCH_ROLE_ARN must be set for batch inference")
         
-        if ingredient_count >= 2:
-            return False
-        return has_mood_keyword
+        job_name = f"dinner-recipes-{uuid.uuid4().hex[:12]}"
+        prefix = f"batch/{job_name}"
+        input_types = []
+        records = []
+        for record_id, user_input in enumerate(user_inputs):
+            is_mood_based = _is_mood_based_input(user_input)
+            input_types.append('mood' if is_mood_based else 'ingredient')
+            request_body = self._create_request_body(user_input, is_mood_based, max_tokens)
+            records.append(b'{"recordId":"%d","modelInput":%s}' % (record_id, request_body))
+        
+        s3 = get_client('s3', config.aws_region)
+        s3.put_object(Bucket=bucket, Key=f"{prefix}/input.jsonl", Body=b'\n'.join(records))
+        
+        bedrock = get_client('bedrock', config.aws_region)
+        job_arn = bedrock.create_model_invocation_job(
+            jobName=job_name,
+            roleArn=role_arn,
+            # Batch jobs always run on Bedrock, even under the Claude SDK backend
+            modelId=config.bedrock_model_id,
+            inputDataConfig={
+                's3InputDataConfig': {
+                    's3Uri': f"s3://{bucket}/{prefix}/input.jsonl",
+                    's3InputFormat': 'JSONL'
+                }
+            },
+            outputDataConfig={
+                's3OutputDataConfig': {'s3Uri': f"s3://{bucket}/{prefix}/output/"}
+            }
+        )['jobArn']
+        logger.debug("Started Bedrock batch job %s with %d records", job_arn, len(records))
+        
+        deadline = time.monotonic() + timeout
+        while True:
+            status = bedrock.get_model_invocation_job(jobIdentifier=job_arn)['status']
+            if status in ('Completed', 'PartiallyCompleted'):
+                break
+            if status in ('Failed', 'Stopped', 'Expired'):
+                raise RuntimeError(f"Bedrock batch job {job_arn} ended with status {status}")
+            if time.monotonic() > deadline:
+                raise TimeoutError(f"Bedrock batch job {job_arn} did not finish within {timeout} seconds")
+            time.sleep(poll_interval)
+        
+        # Output lands in <output prefix>/<job id>/<input file name>.out
+        job_id = job_arn.split('/')[-1]
+        output = s3.get_object(Bucket=bucket, Key=f"{prefix}/output/{job_id}/input.jsonl.out")['Body'].read()
+        
+        results = [
+            {
+                'success': False,
+                'recipes': None,
+                'error': "An error occurred while processing your request.",
+                'input_type': input_type
+            }
+            for input_type in input_types
+        ]
+        for line in output.splitlines():
+            if not line.strip():
+                continue
+            record = orjson.loads(line) if orjson is not None else json.loads(line)
+            model_output = record.get('modelOutput')
+            if not model_output:
+                continue
+            record_id = int(record['recordId'])
+            results[record_id] = {
+                'success': True,
+                'recipes': self._parse_recipes(model_output['content'][0]['text']),
+                'error': None,
+                'input_type': input_types[record_id]
+            }
+        return results
     
-    def _create_prompt(self, user_input: str, is_mood_based: bool) -> str:
-        """Create appropriate prompt based on input type"""
-        if is_mood_based:
-            return f"""あなたはプロの料理アドバイザーです。
-ユーザーの今の気分や食べたいものの希望に基づいて、ぴったりの晩御飯メニューを提案してください。
-
-ユーザーの気分・希望: {user_input}
-
-この気分にぴったり合う晩御飯メニューを2-3個提案してください。
-
-提案フォーマット:
-1. [メニュー名]
-   - 簡単な説明
-
-2. [メニュー名]  
-   - 簡単な説明
+    def _create_request_body(self, user_input: str, is_mood_based: bool, max_tokens: int) -> bytes:
+        """Create the serialized Bedrock request body for the input type
 
-メニュー名は具体的で、説明は2-3文で記載してください。"""
+        The body is pre-rendered as UTF-8 bytes for each (input type, max_tokens,
+        temperature) combination; per request only the escaped user input is
+        spliced in, so the static prompt prefix is never re-encoded.
+        """
+        max_tokens = _budget_max_tokens(user_input, is_mood_based, int(max_tokens))
+        before, after = _request_body_affixes(is_mood_based, max_tokens, float(self.temperature))
+        
+        if orjson is not None:
+            escaped_input = orjson.dumps(user_input)[1:-1]
         else:
-            return f"""あなたは優秀な料理アドバイザーです。
-冷蔵庫にある以下の食材を中心に使って、美味しい晩御飯のメニューを2-3個提案してください。
-
-冷蔵庫の食材: {user_input}
-
-**重要な指示:**
-1. 主に冷蔵庫の食材を活用したメニューを考案
-2. 足りない調味料や小工材がある場合は「追加で必要な材料」として明記
-3. 家庭で作りやすく、実用的なレシピを提案
-4. 冷蔵庫の食材を無駄なく使えるメニューを優先
-
-提案フォーマット:
-1. [メニュー名]
-   - 簡単な説明（1-2文）
-   - 追加で必要な材料: （もしあれば）
-
-2. [メニュー名]
-   - 簡単な説明（1-2文）  
-   - 追加で必要な材料: （もしあれば）
-
-3. [メニュー名]
-   - 簡単な説明（1-2文）
-   - 追加で必要な材料: （もしあれば）
-
-メニュー名は具体的で、実際に作れるものを提案してください。"""
+            escaped_input = json.dumps(user_input, ensure_ascii=False)[1:-1].encode('utf-8')
+        
+        return before + escaped_input + after
     
-    def _invoke_claude(self, prompt: str, max_tokens: int) -> str:
-        """Invoke Claude model via Bedrock"""
-        request_body = {
-            "anthropic_version": "bedrock-2023-05-31",
-            "max_tokens": max_tokens,
-            "messages": [
-                {
-                    "role": "user",
-                    "content": prompt
-                }
-            ],
-            "temperature": 0.7,
-            "top_p": 0.95
+    def _invoke_bedrock(self, operation: str, request_body: bytes) -> Dict[str, Any]:
+        """Call a Bedrock invoke operation, falling back from latency-optimized mode"""
+        invoke_kwargs = {
+            'modelId': self.model_id,
+            'contentType': "application/json",
+            'accept': "application/json",
+            'body': request_body
         }
+        if self.latency_optimized:
+            invoke_kwargs['performanceConfigLatency'] = 'optimized'
         
-        print(f"DEBUG: Bedrock request body: {json.dumps(request_body, indent=2, ensure_ascii=False)}")
-        print(f"DEBUG: Model ID: {self.model_id}")
+        invoke = getattr(self.client, operation)
+        try:
+            return invoke(**invoke_kwargs)
+        except ClientError as e:
+            # Not every model/region supports latency-optimized inference
+            if not self.latency_optimized or e.response['Error']['Code'] != 'ValidationException':
+                raise
+            logger.debug("Latency-optimized inference unavailable, falling back to standard: %s", e)
+            self.latency_optimized = False
+            invoke_kwargs.pop('performanceConfigLatency')
+            return invoke(**invoke_kwargs)
+    
+    def _invoke_claude(self, request_body: bytes) -> str:
+        """Invoke Claude model via Bedrock"""
+        logger.debug("Bedrock request body: %s, model ID: %s", request_body, self.model_id)
         
         try:
-            response = self.client.invoke_model(
-                modelId=self.model_id,
-                contentType="application/json",
-                accept="application/json",
-                body=json.dumps(request_body)
-            )
+            response = self._invoke_bedrock('invoke_model', request_body)
             
-            response_body = json.loads(response['body'].read())
-            print(f"DEBUG: Bedrock response body: {json.dumps(response_body, indent=2, ensure_ascii=False)}")
+            raw_body = response['body'].read()
+            response_body = orjson.loads(raw_body) if orjson is not None else json.loads(raw_body)
+            logger.debug("Bedrock response body: %s", response_body)
+            usage = response_body.get('usage', {})
+            logger.debug("Prompt cache read tokens: %s, write tokens: %s",
+                         usage.get('cache_read_input_tokens', 0),
+                         usage.get('cache_creation_input_tokens', 0))
             return response_body['content'][0]['text']
             
         except ClientError as e:
-            print(f"DEBUG: Bedrock ClientError: {e.response}")
+            logger.exception("Bedrock ClientError: %s", e.response)
             raise
-        except Exception as e:
-            print(f"DEBUG: Bedrock Exception: {str(e)}")
+        except Exception:
+            logger.exception("Bedrock invocation failed")
             raise
     
-    def _parse_recipes(self, response_text: str) -> List[Dict[str, str]]:
-        """Parse recipe response into structured format with additional ingredients"""
-        recipes = []
+    def _invoke_claude_stream(self, request_body: bytes) -> Iterator[str]:
+        """Invoke Claude model via Bedrock streaming, yielding text deltas as they arrive"""
+        logger.debug("Bedrock streaming request, model ID: %s", self.model_id)
         
-        # Enhanced pattern to capture recipe sections including additional ingredients
-        recipe_pattern = r'(\d+)\.\s*\[([^\]]+)\]\s*\n\s*-\s*([^\n]+(?:\n(?!\s*-\s*追加|\d+\.)[^\n]*)*)\s*(?:\n\s*-\s*追加で必要な材料:\s*([^\n]+(?:\n(?!\d+\.)[^\n]*)*?))?'
-        matches = re.findall(recipe_pattern, response_text, re.DOTALL | re.MULTILINE)
+        response = self._invoke_bedrock('invoke_model_with_response_stream', request_body)
+        for event in response['body']:
+            chunk = event.get('chunk')
+            if not chunk:
+                continue
+            data = orjson.loads(chunk['bytes']) if orjson is not None else json.loads(chunk['bytes'])
+            if data.get('type') == 'content_block_delta':
+                delta = data.get('delta', {})
+                if delta.get('type') == 'text_delta':
+                    yield delta['text']
+            elif data.get('type') == 'message_start':
+                usage = data.get('message', {}).get('usage', {})
+                logger.debug("Prompt cache read tokens: %s, write tokens: %s",
+                             usage.get('cache_read_input_tokens', 0),
+                             usage.get('cache_creation_input_tokens', 0))
+    
+    def _stream_recipes(self, request_body: bytes) -> Iterator[Dict[str, str]]:
+        """Yield parsed recipes as soon as each numbered block is complete in the stream"""
+        buffer = ''
+        for delta in self._invoke_claude_stream(request_body):
+            buffer += delta
+            # A new "N." header means everything before it is a finished block
+            while True:
+                boundary = RECIPE_BOUNDARY_PATTERN.search(buffer, 1)
+                if not boundary:
+                    break
+                block, buffer = buffer[:boundary.start() + 1], buffer[boundary.start() + 1:]
+                yield from self._parse_recipes(block)
+        if buffer.strip():
+            yield from self._parse_recipes(buffer)
+    
+    def stream_recipes(self, user_input: str, max_tokens: int = 1000) -> Iterator[Dict[str, str]]:
+        """
+        Stream recipe suggestions, yielding each recipe once it is fully generated
         
-        for match in matches:
-            number, name, description, additional_ingredients = match
-            recipe = {
-                'number': number.strip(),
-                'name': name.strip(),
-                'description': description.strip()
-            }
-            
-            # Add additional ingredients if present
-            if additional_ingredients and additional_ingredients.strip():
-                additional = additional_ingredients.strip()
-                if additional and additional != '（もしあれば）' and additional != 'なし':
-                    recipe['description'] += f"\n🛒 追加で必要: {additional}"
+        Args:
+            user_input: User's input (ingredients or mood)
+            max_tokens: Maximum tokens for generation
             
-            recipes.append(recipe)
+        Returns:
+            Iterator of recipe dicts (number, name, description)
+        """
+        is_mood_based = _is_mood_based_input(user_input)
+        request_body = self._create_request_body(user_input, is_mood_based, max_tokens)
+        return self._stream_recipes(request_body)
+    
+    def _parse_recipes(self, response_text: str) -> List[Dict[str, str]]:
+        """Parse recipe response into structured format with additional ingredients
+
+        Single linear pass over the lines: "N." starts a recipe, the first
+        "-" line is the description, "追加で必要" lines carry the additional
+        ingredients, and other lines continue the description as written.
+        No backtracking regex is involved.
+        """
+        recipes = []
+        current_recipe = None
+        additional = ''
         
-        # Fallback parsing if enhanced pattern doesn't work
-        if not recipes:
-            # Try simpler pattern first
-            simple_pattern = r'(\d+)\.\s*(.+?)\n\s*-\s*(.+?)(?=\n\d+\.|$)'
-            matches = re.findall(simple_pattern, response_text, re.DOTALL)
+        for raw_line in response_text.splitlines():
+            line = raw_line.strip()
+            if not line:
+                continue
             
-            for match in matches:
-                number, name, description = match
-                recipes.append({
-                    'number': number.strip(),
-                    'name': name.strip(),
-                    'description': description.strip()
-                })
+            title_match = RECIPE_TITLE_PATTERN.match(line)
+            if title_match:
+                if current_recipe:
+                    recipes.append(self._finish_recipe(current_recipe, additional))
+                current_recipe = {
+                    'number': title_match.group(1),
+                    'name': title_match.group(2).strip('[]'),
+                    'description': ''
+                }
+                additional = ''
+            elif current_recipe is None:
+                continue
+            elif line.startswith('-') and line[1:].lstrip().startswith('追加で必要'):
+                additional = ADDITIONAL_PREFIX_PATTERN.sub('', line[1:].lstrip())
+            elif current_recipe['description']:
+                # Later lines keep their indentation, as the model wrote them
+                current_recipe['description'] += '\n' + raw_line.rstrip()
+            else:
+                current_recipe['description'] = line[1:].strip() if line.startswith('-') else line
         
-        # Ultimate fallback parsing
-        if not recipes:
-            lines = response_text.split('\n')
-            current_recipe = None
-            
-            for line in lines:
-                line = line.strip()
-                if re.match(r'^\d+\.', line):
-                    if current_recipe:
-                        recipes.append(current_recipe)
-                    current_recipe = {
-                        'number': re.match(r'^(\d+)\.', line).group(1),
-                        'name': re.sub(r'^\d+\.\s*[\[\]]*', '', line).strip('[]'),
-                        'description': '',
-                        'additional_ingredients': ''
-                    }
-                elif line.startswith('-') and current_recipe:
-                    if '追加で必要な材料' in line or '追加で必要' in line:
-                        additional = re.sub(r'^\s*-\s*追加で必要な材料:\s*', '', line)
-                        if current_recipe['description']:
-                            current_recipe['description'] += f"\n🛒 追加で必要: {additional}"
-                        else:
-                            current_recipe['additional_ingredients'] = additional
-                    else:
-                        current_recipe['description'] = line[1:].strip()
-                elif current_recipe and line and not line.startswith('**'):
-                    # Continue description if not a new section
-                    if current_recipe['description']:
-                        current_recipe['description'] += ' ' + line
-            
-            if current_recipe:
-                # Merge additional ingredients if needed
-                if current_recipe.get('additional_ingredients'):
-                    current_recipe['description'] += f"\n🛒 追加で必要: {current_recipe['additional_ingredients']}"
-                # Remove the temporary key
-                current_recipe.pop('additional_ingredients', None)
-                recipes.append(current_recipe)
+        if current_recipe:
+            recipes.append(self._finish_recipe(current_recipe, additional))
         
         return recipes
     
+    def _finish_recipe(self, recipe: Dict[str, str], additional: str) -> Dict[str, str]:
+        """Append additional ingredients to a parsed recipe's description"""
+        if additional and additional not in ('（もしあれば）', 'なし'):
+            recipe['description'] += f"\n🛒 追加で必要: {additional}"
+        return recipe
+    
     def _handle_bedrock_error(self, error_code: str) -> str:
         """Convert Bedrock error codes to user-friendly messages"""
         error_messages = {
@@ -275,4 +691,22 @@ class RecipeService:
             'AccessDeniedException': "Access denied to the AI service.",
             'ServiceUnavailableException': "The service is temporarily unavailable."
         }
-        return error_messages.get(error_code, "An error occurred while processing your request.")
\ No newline at end of file
+        return error_messages.get(error_code, "An error occurred while processing your request.")
+
+# Container-wide RecipeService shared by the LINE and Slack handlers
+_recipe_service: Optional[RecipeService] = None
+_recipe_service_lock = threading.Lock()
+
+
+def get_recipe_service() -> RecipeService:
+    """Get or create the shared RecipeService instance
+
+    Returns:
+        RecipeService shared by every handler in this container
+    """
+    global _recipe_service
+    if _recipe_service is None:
+        with _recipe_service_lock:
+            if _recipe_service is None:
+                _recipe_service = RecipeService()
+    return _recipe_service
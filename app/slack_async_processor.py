@@ -3,7 +3,7 @@ Slack Async Processor - Handle recipe generation and send results back to Slack
 This function is invoked asynchronously by the instant responder
 """
 import json
-import requests
+import logging
 import sys
 import os
 from typing import Dict, Any
@@ -11,14 +11,32 @@ from typing import Dict, Any
 # Add app directory to path for imports
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
-from recipe_service import RecipeService
+from recipe_service import get_recipe_service
+from config import config
+from http_clients import create_session, post_json
+
+logger = logging.getLogger(__name__)
+logger.setLevel(config.log_level)
+
+# Module-level session for Slack response_url POSTs, reused by warm Lambda containers
+_SESSION = create_session(pool_connections=4, pool_maxsize=8)
+
+# Static Block Kit blocks, built once per container (requests only reads them)
+COMPLETED_HEADER_BLOCK = {
+    'type': 'header',
+    'text': {
+        'type': 'plain_text',
+        'text': '🍽️ レシピ提案完了！'
+    }
+}
+DIVIDER_BLOCK = {'type': 'divider'}
 
 def lambda_handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
     """
     Process recipe generation asynchronously and send result to Slack
     This function has no time constraints since it's invoked asynchronously
     """
-    print(f"DEBUG: Slack async processor invoked with event: {json.dumps(event)}")
+    logger.debug("Async processor event: %s", event)
     
     try:
         # Extract data from the event
@@ -39,8 +57,8 @@ def lambda_handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
         
         # Initialize recipe service
         try:
-            recipe_service = RecipeService()
-            print("DEBUG: Recipe service initialized successfully")
+            recipe_service = get_recipe_service()
+            logger.debug("Recipe service ready")
         except Exception as e:
             print(f"DEBUG: Failed to initialize recipe service: {str(e)}")
             # Send error message to Slack
@@ -50,7 +68,7 @@ def lambda_handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
                 'text': f"❌ サービス初期化エラー: {str(e)}"
             }
             try:
-                requests.post(response_url, json=error_payload, timeout=10)
+                post_json(_SESSION, response_url, error_payload, timeout=10)
             except:
                 pass
             return {'statusCode': 500, 'body': 'Service initialization failed'}
@@ -63,13 +81,7 @@ def lambda_handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
         if result['success'] and result['recipes']:
             # Format recipes for Slack using Block Kit
             blocks = [
-                {
-                    'type': 'header',
-                    'text': {
-                        'type': 'plain_text',
-                        'text': '🍽️ レシピ提案完了！'
-                    }
-                },
+                COMPLETED_HEADER_BLOCK,
                 {
                     'type': 'context',
                     'elements': [{
@@ -90,7 +102,7 @@ def lambda_handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
                 })
             
             # Add divider at the end
-            blocks.append({'type': 'divider'})
+            blocks.append(DIVIDER_BLOCK)
             
             # Prepare the payload
             success_payload = {
@@ -110,10 +122,10 @@ def lambda_handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
         
         # Send the result back to Slack
         print(f"DEBUG: Sending result to Slack response_url: {response_url}")
-        response = requests.post(
+        response = post_json(
+            _SESSION,
             response_url,
-            json=success_payload,
-            headers={'Content-Type': 'application/json'},
+            success_payload,
             timeout=15
         )
         
@@ -143,7 +155,7 @@ def lambda_handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
                     'replace_original': True,
                     'text': f"❌ エラーが発生しました: {str(e)}"
                 }
-                requests.post(event['response_url'], json=error_payload, timeout=5)
+                post_json(_SESSION, event['response_url'], error_payload, timeout=5)
                 print("DEBUG: Sent error message to Slack")
             except:
                 print("DEBUG: Failed to send error message to Slack")
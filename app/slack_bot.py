@@ -2,16 +2,94 @@
 Slack Bot handler for dinner suggestion bot
 """
 import json
+import re
 import time
 import hmac
-import hashlib
-import requests
 import threading
 from typing import Dict, Any
-from urllib.parse import parse_qs
 from config import config
-from recipe_service import RecipeService
-from ingredient_storage import IngredientStorage
+from http_clients import create_session, dumps, post_json
+from recipe_service import get_recipe_service
+from ingredient_storage import IngredientStorage, split_ingredients_text
+from slack_forms import parse_form_fields
+
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+# Module-level session for Slack response_url POSTs, reused by warm Lambda containers
+_SESSION = create_session(pool_connections=4, pool_maxsize=8)
+
+
+# Fully static responses, serialized once per container
+HELP_RESPONSE = {
+    'statusCode': 200,
+    'headers': {'Content-Type': 'application/json'},
+    'body': dumps({
+        'response_type': 'ephemeral',
+        'text': '🍽️ 晩御飯提案BOTの使い方',
+        'blocks': [
+            {
+                'type': 'section',
+                'text': {
+                    'type': 'mrkdwn',
+                    'text': '*晩御飯提案BOTの使い方*\n\n食材や気分を教えてください。美味しいメニューを提案します！'
+                }
+            },
+            {
+                'type': 'section',
+                'text': {
+                    'type': 'mrkdwn',
+                    'text': '*📝 レシピ提案*\n• `/dinner キャベツと鶏肉`\n• `/dinner さっぱりしたものが食べたい`'
+                }
+            },
+            {
+                'type': 'section',
+                'text': {
+                    'type': 'mrkdwn',
+                    'text': '*💾 食材管理*\n• `/dinner add キャベツ 鶏肉` - 食材を追加\n• `/dinner list` - 登録済み食材を表示\n• `/dinner clear` - 登録済み食材を削除'
+                }
+            }
+        ]
+    })
+}
+UNAUTHORIZED_BODY = dumps({'error': 'Unauthorized'})
+IGNORED_BODY = dumps({'status': 'ignored'})
+OK_BODY = dumps({'status': 'ok'})
+
+# Constant Block Kit blocks for recipe responses (serialized, never mutated)
+RECIPE_HEADER_BLOCK = {
+    'type': 'header',
+    'text': {
+        'type': 'plain_text',
+        'text': '🍽️ メニュー提案'
+    }
+}
+MOOD_CONTEXT_BLOCK = {
+    'type': 'context',
+    'elements': [{'type': 'mrkdwn', 'text': '_気分に合わせた提案_'}]
+}
+INGREDIENT_CONTEXT_BLOCK = {
+    'type': 'context',
+    'elements': [{'type': 'mrkdwn', 'text': '_食材を使った提案_'}]
+}
+DIVIDER_BLOCK = {'type': 'divider'}
+
+# RecipeService error -> Japanese message shown in Slack
+ERROR_MESSAGES = {
+    "The service is currently experiencing high demand. Please try again in a moment.":
+        "現在アクセスが集中しています。少し時間をおいてからお試しください。",
+    "The AI model is preparing. Please wait a moment and try again.":
+        "AIモデルが準備中です。しばらくお待ちください。",
+    "An error occurred while processing your request.":
+        "レシピの生成中にエラーが発生しました。"
+}
+
+# Bot mention markup in event text, e.g. <@U012AB3CD>
+BOT_MENTION_PATTERN = re.compile(r'<@[A-Z0-9]+>')
 
 
 class SlackBotHandler:
@@ -26,9 +104,13 @@ class SlackBotHandler:
             print(f"Slack configuration not complete: {error}")
         else:
             print("DEBUG: Slack configuration is valid")
+        # Encoded once; used as the HMAC key for every request signature check
+        self._signing_secret_bytes = (config.slack_signing_secret or '').encode('utf-8')
+        # Keyed once; each request works on a copy so the ipad/opad setup is not repeated
+        self._signature_hmac = hmac.new(self._signing_secret_bytes, digestmod='sha256')
         
         try:
-            self.recipe_service = RecipeService()
+            self.recipe_service = get_recipe_service()
             print("DEBUG: Recipe service initialized successfully")
             self.ingredient_storage = IngredientStorage()
             print("DEBUG: Ingredient storage initialized successfully")
@@ -38,20 +120,19 @@ class SlackBotHandler:
     
     def handle_slash_command(self, body: str, headers: Dict[str, str]) -> Dict[str, Any]:
         """Handle Slack slash command (/dinner) with immediate ACK and async processing"""
-        # Verify Slack signature (temporarily disabled for testing)
-        print("TEMP: Skipping signature verification for testing")
-        # if not self._verify_signature(body, headers):
-        #     return {
-        #         'statusCode': 401,
-        #         'body': json.dumps({'error': 'Unauthorized'})
-        #     }
+        # Verify Slack signature
+        if not self._verify_signature(body, headers):
+            return {
+                'statusCode': 401,
+                'body': UNAUTHORIZED_BODY
+            }
         
         try:
             # Parse slash command data
-            command_data = parse_qs(body)
-            text = command_data.get('text', [''])[0]
-            response_url = command_data.get('response_url', [''])[0]
-            user_id = command_data.get('user_id', [''])[0]
+            command_data = parse_form_fields(body, ('text', 'response_url', 'user_id'))
+            text = command_data.get('text', '')
+            response_url = command_data.get('response_url', '')
+            user_id = command_data.get('user_id', '')
             
             print(f"DEBUG: Processing slash command: text='{text}', response_url='{response_url}', user_id='{user_id}'")
             
@@ -77,7 +158,7 @@ class SlackBotHandler:
             immediate_ack = {
                 'statusCode': 200,
                 'headers': {'Content-Type': 'application/json'},
-                'body': json.dumps({
+                'body': dumps({
                     'response_type': 'in_channel',
                     'text': '🍽️ レシピを生成中です... 少々お待ちください！'
                 })
@@ -128,7 +209,7 @@ class SlackBotHandler:
                         'replace_original': True,
                         'text': '❌ 登録済みの食材がありません。\n`/dinner add 食材名` で食材を登録してください。'
                     }
-                    requests.post(response_url, json=error_payload, timeout=5)
+                    post_json(_SESSION, response_url, error_payload, timeout=5)
                     return
             
             # Generate recipe
@@ -137,11 +218,12 @@ class SlackBotHandler:
             
             if result['success'] and result['recipes']:
                 # Format recipes for Slack
-                formatted_text = f"🍽️ **{text}** を使ったレシピの提案です：\n\n"
-                
-                for recipe in result['recipes']:
-                    formatted_text += f"**{recipe['number']}. {recipe['name']}**\n"
-                    formatted_text += f"   {recipe['description']}\n\n"
+                parts = [f"🍽️ **{text}** を使ったレシピの提案です：\n\n"]
+                parts.extend(
+                    f"**{recipe['number']}. {recipe['name']}**\n   {recipe['description']}\n\n"
+                    for recipe in result['recipes']
+                )
+                formatted_text = ''.join(parts)
                 
                 # Send follow-up message to Slack
                 follow_up_payload = {
@@ -160,10 +242,10 @@ class SlackBotHandler:
             
             # Send the follow-up message to Slack
             print(f"DEBUG: Sending follow-up to response_url: {response_url}")
-            response = requests.post(
+            response = post_json(
+                _SESSION,
                 response_url,
-                json=follow_up_payload,
-                headers={'Content-Type': 'application/json'},
+                follow_up_payload,
                 timeout=10
             )
             
@@ -184,28 +266,42 @@ class SlackBotHandler:
                     'replace_original': True,
                     'text': f"❌ エラーが発生しました: {str(e)}"
                 }
-                requests.post(response_url, json=error_payload, timeout=5)
+                post_json(_SESSION, response_url, error_payload, timeout=5)
             except:
                 print("DEBUG: Failed to send error message to Slack")
     
     def handle_event(self, body: str, headers: Dict[str, str]) -> Dict[str, Any]:
         """Handle Slack event (mentions, DMs)"""
+        # URL verification only echoes the challenge back; answer it before
+        # paying for the HMAC check and the general event parsing
+        if '"url_verification"' in body:
+            try:
+                event_data = orjson.loads(body) if orjson is not None else json.loads(body)
+            except ValueError:
+                event_data = {}
+            if event_data.get('type') == 'url_verification':
+                return {
+                    'statusCode': 200,
+                    'body': dumps({'challenge': event_data['challenge']})
+                }
+        
+        # Event types other than app_mention/message are ignored; when neither
+        # name appears anywhere in the body, skip verification and parsing
+        if '"app_mention"' not in body and '"message"' not in body:
+            return {
+                'statusCode': 200,
+                'body': IGNORED_BODY
+            }
+        
         # Verify Slack signature
         if not self._verify_signature(body, headers):
             return {
                 'statusCode': 401,
-                'body': json.dumps({'error': 'Unauthorized'})
+                'body': UNAUTHORIZED_BODY
             }
         
         try:
-            event_data = json.loads(body)
-            
-            # Handle URL verification challenge
-            if event_data.get('type') == 'url_verification':
-                return {
-                    'statusCode': 200,
-                    'body': json.dumps({'challenge': event_data['challenge']})
-                }
+            event_data = orjson.loads(body) if orjson is not None else json.loads(body)
             
             # Handle app_mention and message events
             event = event_data.get('event', {})
@@ -214,36 +310,45 @@ class SlackBotHandler:
             if event_type not in ['app_mention', 'message']:
                 return {
                     'statusCode': 200,
-                    'body': json.dumps({'status': 'ignored'})
+                    'body': IGNORED_BODY
                 }
             
-            # Extract message text
-            text = event.get('text', '')
-            text = self._remove_bot_mention(text)
-            
-            # Generate recipe suggestions
-            result = self.recipe_service.generate_recipe(text, max_tokens=800)
+            self._process_event(event)
             
             return {
                 'statusCode': 200,
-                'body': json.dumps({'status': 'ok'})
+                'body': OK_BODY
             }
             
         except Exception as e:
             return {
                 'statusCode': 500,
-                'body': json.dumps({'error': 'Internal server error'})
+                'body': dumps({'error': 'Internal server error'})
             }
     
+    def _process_event(self, event: Dict[str, Any]) -> Dict[str, Any]:
+        """Generate recipe suggestions for a single app_mention/message event
+        
+        The Events API delivers exactly one event per request, so events are
+        processed inline rather than fanned out to a worker pool.
+        
+        Args:
+            event: The inner Slack event object
+            
+        Returns:
+            RecipeService result dict
+        """
+        # Extract message text
+        text = self._remove_bot_mention(event.get('text', ''))
+        
+        # Generate recipe suggestions
+        return self.recipe_service.generate_recipe(text, max_tokens=800)
+    
     def _verify_signature(self, body: str, headers: Dict[str, str]) -> bool:
         """Verify Slack request signature"""
         if not config.slack_signing_secret:
             return True
         
-        # Temporarily skip verification for testing
-        print("TEMP: Skipping signature verification for testing")
-        return True
-        
         # Get headers with case-insensitive lookup
         timestamp = None
         signature = None
@@ -260,28 +365,29 @@ class SlackBotHandler:
         
         try:
             # Check timestamp to prevent replay attacks (5 minutes tolerance)
-            current_time = time.time()
-            request_time = float(timestamp)
+            # Slack sends integer Unix seconds; a non-integer value raises ValueError
+            current_time = int(time.time())
+            request_time = int(timestamp)
             if abs(current_time - request_time) > 300:
                 print(f"Timestamp too old: {current_time - request_time} seconds")
                 return False
             
-            # Create signature base string
-            sig_basestring = f"v0:{timestamp}:{body}"
+            # Feed the "v0:{timestamp}:{body}" base string to a copy of the
+            # pre-keyed HMAC piece by piece instead of concatenating the body
+            mac = self._signature_hmac.copy()
+            mac.update(b'v0:')
+            mac.update(timestamp.encode('ascii'))
+            mac.update(b':')
+            mac.update(body.encode('utf-8') if isinstance(body, str) else body)
+            expected_sig = b'v0=' + mac.hexdigest().encode('ascii')
             
-            # Calculate expected signature
-            expected_sig = 'v0=' + hmac.new(
-                config.slack_signing_secret.encode('utf-8'),
-                sig_basestring.encode('utf-8'),
-                hashlib.sha256
-            ).hexdigest()
-            
-            # Compare signatures using constant-time comparison
-            is_valid = hmac.compare_digest(expected_sig, signature)
+            # Compare signatures as bytes using constant-time comparison
+            # (a non-ASCII header raises UnicodeEncodeError, handled below)
+            is_valid = hmac.compare_digest(expected_sig, signature.encode('ascii'))
             
             if not is_valid:
-                print(f"Signature mismatch - expected: {expected_sig[:20]}..., got: {signature[:20]}...")
-                print(f"Base string: {sig_basestring}")
+                print(f"Signature mismatch - expected: {expected_sig[:20].decode('ascii')}..., got: {signature[:20]}...")
+                print(f"Request timestamp: {timestamp}")
             
             return is_valid
             
@@ -291,55 +397,17 @@ class SlackBotHandler:
     
     def _create_help_response(self) -> Dict[str, Any]:
         """Create help response for Slack"""
-        return {
-            'statusCode': 200,
-            'headers': {'Content-Type': 'application/json'},
-            'body': json.dumps({
-                'response_type': 'ephemeral',
-                'text': '🍽️ 晩御飯提案BOTの使い方',
-                'blocks': [
-                    {
-                        'type': 'section',
-                        'text': {
-                            'type': 'mrkdwn',
-                            'text': '*晩御飯提案BOTの使い方*\n\n食材や気分を教えてください。美味しいメニューを提案します！'
-                        }
-                    },
-                    {
-                        'type': 'section',
-                        'text': {
-                            'type': 'mrkdwn',
-                            'text': '*📝 レシピ提案*\n• `/dinner キャベツと鶏肉`\n• `/dinner さっぱりしたものが食べたい`'
-                        }
-                    },
-                    {
-                        'type': 'section',
-                        'text': {
-                            'type': 'mrkdwn',
-                            'text': '*💾 食材管理*\n• `/dinner add キャベツ 鶏肉` - 食材を追加\n• `/dinner list` - 登録済み食材を表示\n• `/dinner clear` - 登録済み食材を削除'
-                        }
-                    }
-                ]
-            })
-        }
+        # Body is serialized once at import; copy the dicts so callers can't mutate it
+        return {**HELP_RESPONSE, 'headers': dict(HELP_RESPONSE['headers'])}
     
     def _create_error_response(self, error: str) -> Dict[str, Any]:
         """Create error response for Slack"""
-        error_messages = {
-            "The service is currently experiencing high demand. Please try again in a moment.": 
-                "現在アクセスが集中しています。少し時間をおいてからお試しください。",
-            "The AI model is preparing. Please wait a moment and try again.":
-                "AIモデルが準備中です。しばらくお待ちください。",
-            "An error occurred while processing your request.":
-                "レシピの生成中にエラーが発生しました。"
-        }
-        
-        message = error_messages.get(error, "エラーが発生しました。もう一度お試しください。")
+        message = ERROR_MESSAGES.get(error, "エラーが発生しました。もう一度お試しください。")
         
         return {
             'statusCode': 200,
             'headers': {'Content-Type': 'application/json'},
-            'body': json.dumps({
+            'body': dumps({
                 'response_type': 'ephemeral',
                 'text': f'⚠️ {message}'
             })
@@ -353,39 +421,19 @@ class SlackBotHandler:
                 'text': 'レシピが見つかりませんでした。'
             }
         
-        # Create blocks for rich formatting
+        # Only the recipe sections are built per response; the rest is shared
         blocks = [
-            {
-                'type': 'header',
-                'text': {
-                    'type': 'plain_text',
-                    'text': '🍽️ メニュー提案'
-                }
-            }
-        ]
-        
-        # Add context about input type
-        context_text = "気分に合わせた提案" if input_type == 'mood' else "食材を使った提案"
-        blocks.append({
-            'type': 'context',
-            'elements': [{
-                'type': 'mrkdwn',
-                'text': f'_{context_text}_'
-            }]
-        })
-        
-        # Add each recipe as a section
-        for recipe in recipes:
-            blocks.append({
+            RECIPE_HEADER_BLOCK,
+            MOOD_CONTEXT_BLOCK if input_type == 'mood' else INGREDIENT_CONTEXT_BLOCK,
+            *({
                 'type': 'section',
                 'text': {
                     'type': 'mrkdwn',
                     'text': f"*{recipe['number']}. {recipe['name']}*\n{recipe['description']}"
                 }
-            })
-        
-        # Add divider at the end
-        blocks.append({'type': 'divider'})
+            } for recipe in recipes),
+            DIVIDER_BLOCK
+        ]
         
         return {
             'response_type': 'in_channel',
@@ -395,8 +443,7 @@ class SlackBotHandler:
     
     def _remove_bot_mention(self, text: str) -> str:
         """Remove bot mention from message text"""
-        import re
-        return re.sub(r'<@[A-Z0-9]+>', '', text).strip()
+        return BOT_MENTION_PATTERN.sub('', text).strip()
     
     def _handle_add_ingredients(self, user_id: str, ingredients_text: str) -> Dict[str, Any]:
         """Handle adding ingredients to storage
@@ -412,20 +459,14 @@ class SlackBotHandler:
             return {
                 'statusCode': 200,
                 'headers': {'Content-Type': 'application/json'},
-                'body': json.dumps({
+                'body': dumps({
                     'response_type': 'ephemeral',
                     'text': '⚠️ 追加する食材を指定してください。\n例: `/dinner add キャベツ 鶏肉`'
                 })
             }
         
         # Parse ingredients (comma or space separated)
-        ingredients = []
-        if '、' in ingredients_text or ',' in ingredients_text:
-            # Handle comma-separated
-            ingredients = [ing.strip() for ing in ingredients_text.replace('、', ',').split(',') if ing.strip()]
-        else:
-            # Handle space-separated
-            ingredients = ingredients_text.split()
+        ingredients = split_ingredients_text(ingredients_text)
         
         # Add to storage
         success = self.ingredient_storage.add_ingredients(user_id, ingredients)
@@ -438,7 +479,7 @@ class SlackBotHandler:
             return {
                 'statusCode': 200,
                 'headers': {'Content-Type': 'application/json'},
-                'body': json.dumps({
+                'body': dumps({
                     'response_type': 'in_channel',
                     'text': f'✅ 食材を追加しました！\n\n{formatted_list}'
                 })
@@ -447,7 +488,7 @@ class SlackBotHandler:
             return {
                 'statusCode': 200,
                 'headers': {'Content-Type': 'application/json'},
-                'body': json.dumps({
+                'body': dumps({
                     'response_type': 'ephemeral',
                     'text': '❌ 食材の追加に失敗しました。もう一度お試しください。'
                 })
@@ -468,7 +509,7 @@ class SlackBotHandler:
         return {
             'statusCode': 200,
             'headers': {'Content-Type': 'application/json'},
-            'body': json.dumps({
+            'body': dumps({
                 'response_type': 'in_channel',
                 'text': formatted_list
             })
@@ -489,7 +530,7 @@ class SlackBotHandler:
             return {
                 'statusCode': 200,
                 'headers': {'Content-Type': 'application/json'},
-                'body': json.dumps({
+                'body': dumps({
                     'response_type': 'in_channel',
                     'text': '🗑️ 登録済みの食材をすべて削除しました。'
                 })
@@ -498,7 +539,7 @@ class SlackBotHandler:
             return {
                 'statusCode': 200,
                 'headers': {'Content-Type': 'application/json'},
-                'body': json.dumps({
+                'body': dumps({
                     'response_type': 'ephemeral',
                     'text': '❌ 食材の削除に失敗しました。もう一度お試しください。'
                 })
@@ -0,0 +1,34 @@
+"""
+Lightweight parsing of Slack slash command form bodies
+Slash commands post ~15 URL-encoded fields; handlers only need a few of them
+"""
+from typing import Dict, Iterable
+from urllib.parse import unquote_plus
+
+
+def parse_form_fields(body: str, keys: Iterable[str]) -> Dict[str, str]:
+    """Decode only the requested fields of an application/x-www-form-urlencoded body
+
+    Unlike parse_qs, other fields are neither split into lists nor
+    URL-decoded, and scanning stops once every requested key has been found.
+    The first occurrence of a key wins, matching parse_qs(...)[key][0].
+
+    Args:
+        body: URL-encoded request body
+        keys: Field names to extract
+
+    Returns:
+        Dict of decoded values for the keys that are present and non-empty
+    """
+    wanted = set(keys)
+    fields: Dict[str, str] = {}
+    for pair in body.split('&'):
+        name, sep, value = pair.partition('=')
+        if not sep or not value:
+            continue
+        name = unquote_plus(name)
+        if name in wanted and name not in fields:
+            fields[name] = unquote_plus(value)
+            if len(fields) == len(wanted):
+                break
+    return fields
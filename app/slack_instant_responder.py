@@ -4,14 +4,60 @@ Slack Instant Responder - Immediate ACK within 3 seconds for Slack commands
 import json
 import os
 import sys
-import boto3
 from typing import Dict, Any
-from urllib.parse import parse_qs
 
 # Add app directory to path for imports
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
-from ingredient_storage import IngredientStorage
+from ingredient_storage import IngredientStorage, split_ingredients_text
+from aws_clients import get_client
+from slack_forms import parse_form_fields
+
+# Reused across warm invocations instead of being rebuilt per command
+_ingredient_storage = None
+
+
+def _get_ingredient_storage() -> IngredientStorage:
+    """Get or create the container-wide IngredientStorage"""
+    global _ingredient_storage
+    if _ingredient_storage is None:
+        _ingredient_storage = IngredientStorage()
+    return _ingredient_storage
+
+
+# Help text never changes, so the response body is serialized once at import
+HELP_RESPONSE = {
+    'statusCode': 200,
+    'headers': {'Content-Type': 'application/json'},
+    'body': json.dumps({
+        'response_type': 'ephemeral',
+        'text': '🍽️ 晩御飯提案BOTの使い方',
+        'blocks': [
+            {
+                'type': 'section',
+                'text': {
+                    'type': 'mrkdwn',
+                    'text': '*晩御飯提案BOTの使い方*\n\n食材や気分を教えてください。美味しいメニューを提案します！'
+                }
+            },
+            {
+                'type': 'section',
+                'text': {
+                    'type': 'mrkdwn',
+                    'text': '*📝 レシピ提案*\n• `/dinner キャベツと鶏肉` - 冷蔵庫の食材でレシピ提案\n• `/dinner さっぱりしたものが食べたい` - 気分でレシピ提案'
+                }
+            },
+            {
+                'type': 'section',
+                'text': {
+                    'type': 'mrkdwn',
+                    'text': '*❄️ 冷蔵庫管理*\n• `/dinner add キャベツ 鶏肉` - 冷蔵庫に食材を追加\n• `/dinner list` - 冷蔵庫の食材を表示\n• `/dinner stored` - 冷蔵庫の食材でレシピ生成\n• `/dinner clear` - 冷蔵庫の食材をクリア'
+                }
+            }
+        ]
+    })
+}
+
 
 def lambda_handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
     """
@@ -28,11 +74,11 @@ def lambda_handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
             body = base64.b64decode(body).decode('utf-8')
         
         # Parse slash command data
-        command_data = parse_qs(body)
-        text = command_data.get('text', [''])[0]
-        response_url = command_data.get('response_url', [''])[0]
-        user_id = command_data.get('user_id', ['unknown'])[0]
-        channel_id = command_data.get('channel_id', ['unknown'])[0]
+        command_data = parse_form_fields(body, ('text', 'response_url', 'user_id', 'channel_id'))
+        text = command_data.get('text', '')
+        response_url = command_data.get('response_url', '')
+        user_id = command_data.get('user_id', 'unknown')
+        channel_id = command_data.get('channel_id', 'unknown')
         
         print(f"DEBUG: Parsed command - text='{text}', response_url present={bool(response_url)}")
         
@@ -57,7 +103,7 @@ def lambda_handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
         
         # Invoke the async processor Lambda function
         if response_url:
-            lambda_client = boto3.client('lambda')
+            lambda_client = get_client('lambda')
             
             # Payload for the async processor
             async_payload = {
@@ -102,37 +148,8 @@ def lambda_handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
 
 def _create_help_response() -> Dict[str, Any]:
     """Create help response for Slack"""
-    return {
-        'statusCode': 200,
-        'headers': {'Content-Type': 'application/json'},
-        'body': json.dumps({
-            'response_type': 'ephemeral',
-            'text': '🍽️ 晩御飯提案BOTの使い方',
-            'blocks': [
-                {
-                    'type': 'section',
-                    'text': {
-                        'type': 'mrkdwn',
-                        'text': '*晩御飯提案BOTの使い方*\n\n食材や気分を教えてください。美味しいメニューを提案します！'
-                    }
-                },
-                {
-                    'type': 'section',
-                    'text': {
-                        'type': 'mrkdwn',
-                        'text': '*📝 レシピ提案*\n• `/dinner キャベツと鶏肉` - 冷蔵庫の食材でレシピ提案\n• `/dinner さっぱりしたものが食べたい` - 気分でレシピ提案'
-                    }
-                },
-                {
-                    'type': 'section',
-                    'text': {
-                        'type': 'mrkdwn',
-                        'text': '*❄️ 冷蔵庫管理*\n• `/dinner add キャベツ 鶏肉` - 冷蔵庫に食材を追加\n• `/dinner list` - 冷蔵庫の食材を表示\n• `/dinner stored` - 冷蔵庫の食材でレシピ生成\n• `/dinner clear` - 冷蔵庫の食材をクリア'
-                    }
-                }
-            ]
-        })
-    }
+    # Copy the dicts so callers can't mutate the shared constant
+    return {**HELP_RESPONSE, 'headers': dict(HELP_RESPONSE['headers'])}
 
 def _handle_add_ingredients(user_id: str, ingredients_text: str) -> Dict[str, Any]:
     """Handle adding ingredients to storage"""
@@ -147,16 +164,10 @@ def _handle_add_ingredients(user_id: str, ingredients_text: str) -> Dict[str, An
         }
     
     try:
-        ingredient_storage = IngredientStorage()
+        ingredient_storage = _get_ingredient_storage()
         
         # Parse ingredients (comma or space separated)
-        ingredients = []
-        if '、' in ingredients_text or ',' in ingredients_text:
-            # Handle comma-separated
-            ingredients = [ing.strip() for ing in ingredients_text.replace('、', ',').split(',') if ing.strip()]
-        else:
-            # Handle space-separated
-            ingredients = ingredients_text.split()
+        ingredients = split_ingredients_text(ingredients_text)
         
         # Add to storage
         success = ingredient_storage.add_ingredients(user_id, ingredients)
@@ -198,7 +209,7 @@ def _handle_add_ingredients(user_id: str, ingredients_text: str) -> Dict[str, An
 def _handle_list_ingredients(user_id: str) -> Dict[str, Any]:
     """Handle listing stored ingredients"""
     try:
-        ingredient_storage = IngredientStorage()
+        ingredient_storage = _get_ingredient_storage()
         ingredients = ingredient_storage.get_ingredients(user_id)
         formatted_list = ingredient_storage.format_ingredients_list(ingredients)
         
@@ -225,7 +236,7 @@ def _handle_list_ingredients(user_id: str) -> Dict[str, Any]:
 def _handle_clear_ingredients(user_id: str) -> Dict[str, Any]:
     """Handle clearing stored ingredients"""
     try:
-        ingredient_storage = IngredientStorage()
+        ingredient_storage = _get_ingredient_storage()
         success = ingredient_storage.clear_ingredients(user_id)
         
         if success:
@@ -261,7 +272,7 @@ def _handle_clear_ingredients(user_id: str) -> Dict[str, Any]:
 def _handle_use_stored_ingredients(user_id: str, response_url: str) -> Dict[str, Any]:
     """Handle using stored ingredients for recipe generation"""
     try:
-        ingredient_storage = IngredientStorage()
+        ingredient_storage = _get_ingredient_storage()
         stored_ingredients = ingredient_storage.get_ingredients(user_id)
         
         if not stored_ingredients:
@@ -276,7 +287,7 @@ def _handle_use_stored_ingredients(user_id: str, response_url: str) -> Dict[str,
         
         # If we have stored ingredients, pass them to async processor
         if response_url:
-            lambda_client = boto3.client('lambda')
+            lambda_client = get_client('lambda')
             
             # Create text from stored ingredients
             ingredients_text = ' '.join(stored_ingredients)
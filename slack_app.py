@@ -7,6 +7,7 @@ from fastapi.responses import JSONResponse, PlainTextResponse
 import hmac
 import hashlib
 import os
+import re
 import time
 import json
 import logging
@@ -32,6 +33,27 @@ app = FastAPI(
 SLACK_BOT_TOKEN = os.getenv("SLACK_BOT_TOKEN")
 SLACK_SIGNING_SECRET = os.getenv("SLACK_SIGNING_SECRET")
 
+# Bot mention tokens (<@U123ABC>) stripped from message text
+BOT_MENTION_PATTERN = re.compile(r'<@[A-Z0-9]+>')
+
+# Static Block Kit blocks shared by every recipe reply (serialized, never mutated)
+RECIPE_HEADER_BLOCK = {
+    "type": "header",
+    "text": {
+        "type": "plain_text",
+        "text": "🍽️ メニュー提案"
+    }
+}
+MOOD_CONTEXT_BLOCK = {
+    "type": "context",
+    "elements": [{"type": "mrkdwn", "text": "_気分に合わせた提案_"}]
+}
+INGREDIENT_CONTEXT_BLOCK = {
+    "type": "context",
+    "elements": [{"type": "mrkdwn", "text": "_食材を使った提案_"}]
+}
+DIVIDER_BLOCK = {"type": "divider"}
+
 # Initialize Slack client
 slack_client = WebClient(token=SLACK_BOT_TOKEN) if SLACK_BOT_TOKEN else None
 
@@ -117,46 +139,23 @@ def format_recipe_blocks(recipes: list, input_type: str) -> list:
     Returns:
         List of Block Kit blocks
     """
-    blocks = [
-        {
-            "type": "header",
-            "text": {
-                "type": "plain_text",
-                "text": "🍽️ メニュー提案"
-            }
-        }
-    ]
-    
-    # Add context about input type
-    context_text = "気分に合わせた提案" if input_type == "mood" else "食材を使った提案"
-    blocks.append({
-        "type": "context",
-        "elements": [{
-            "type": "mrkdwn",
-            "text": f"_{context_text}_"
-        }]
-    })
-    
-    # Add each recipe as a section
-    for recipe in recipes:
-        blocks.append({
+    return [
+        RECIPE_HEADER_BLOCK,
+        MOOD_CONTEXT_BLOCK if input_type == "mood" else INGREDIENT_CONTEXT_BLOCK,
+        *({
             "type": "section",
             "text": {
                 "type": "mrkdwn",
                 "text": f"*{recipe['number']}. {recipe['name']}*\n{recipe['description']}"
             }
-        })
-    
-    # Add divider at the end
-    blocks.append({"type": "divider"})
-    
-    return blocks
+        } for recipe in recipes),
+        DIVIDER_BLOCK
+    ]
 
 
 def remove_bot_mention(text: str) -> str:
     """Remove bot mention from message text"""
-    import re
-    return re.sub(r'<@[A-Z0-9]+>', '', text).strip()
+    return BOT_MENTION_PATTERN.sub('', text).strip()
 
 
 @app.get("/")
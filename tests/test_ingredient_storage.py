@@ -4,10 +4,12 @@ Test cases for ingredient storage functionality
 import sys
 import os
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+# app modules import their siblings flat (from aws_clients import ...)
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'app')))
 
 import unittest
 from unittest.mock import Mock, patch, MagicMock
-from app.ingredient_storage import IngredientStorage
+from app.ingredient_storage import IngredientStorage, split_ingredients_text
 
 
 class TestIngredientStorage(unittest.TestCase):
@@ -17,10 +19,10 @@ class TestIngredientStorage(unittest.TestCase):
         """Set up test fixtures"""
         self.mock_dynamodb = Mock()
         
-        # Patch boto3.client to return our mock
-        patcher = patch('app.ingredient_storage.boto3.client')
-        self.mock_boto3_client = patcher.start()
-        self.mock_boto3_client.return_value = self.mock_dynamodb
+        # Patch the shared client factory to return our mock
+        patcher = patch('app.ingredient_storage.get_client')
+        self.mock_get_client = patcher.start()
+        self.mock_get_client.return_value = self.mock_dynamodb
         self.addCleanup(patcher.stop)
         
         self.storage = IngredientStorage()
@@ -59,80 +61,207 @@ class TestIngredientStorage(unittest.TestCase):
         
         self.assertEqual(result, ['キャベツ', '鶏肉', 'にんじん'])
     
-    def test_add_ingredients_new_user(self):
-        """Test adding ingredients for a new user"""
-        # Mock get_item to return empty (new user)
-        self.mock_dynamodb.get_item.return_value = {}
+    def test_get_ingredients_string_set(self):
+        """Test getting ingredients stored as a string set"""
+        self.mock_dynamodb.get_item.return_value = {
+            'Item': {
+                'user_id': {'S': self.test_user_id},
+                'ingredients': {'SS': ['キャベツ', '鶏肉']}
+            }
+        }
         
-        # Mock put_item to succeed
-        self.mock_dynamodb.put_item.return_value = {'ResponseMetadata': {'HTTPStatusCode': 200}}
+        result = self.storage.get_ingredients(self.test_user_id)
+        
+        self.assertEqual(sorted(result), sorted(['キャベツ', '鶏肉']))
+    
+    def test_add_ingredients_single_update(self):
+        """Test adding ingredients with a single UpdateItem ADD"""
+        self.mock_dynamodb.update_item.return_value = {'ResponseMetadata': {'HTTPStatusCode': 200}}
         
         result = self.storage.add_ingredients(self.test_user_id, ['キャベツ', '鶏肉'])
         
         self.assertTrue(result)
-        self.mock_dynamodb.put_item.assert_called_once()
+        self.mock_dynamodb.get_item.assert_not_called()
+        self.mock_dynamodb.put_item.assert_not_called()
+        self.mock_dynamodb.update_item.assert_called_once_with(
+            TableName='DinnerBotIngredients',
+            Key={'user_id': {'S': self.test_user_id}},
+            UpdateExpression='ADD ingredients :new_ingredients',
+            ExpressionAttributeValues={':new_ingredients': {'SS': ['キャベツ', '鶏肉']}},
+            ReturnValues='UPDATED_NEW'
+        )
+    
+    def test_add_ingredients_duplicate_handling(self):
+        """Test that duplicate ingredients are not sent in the string set"""
+        self.mock_dynamodb.update_item.return_value = {'ResponseMetadata': {'HTTPStatusCode': 200}}
         
-        # Check the put_item call arguments
-        put_call_args = self.mock_dynamodb.put_item.call_args[1]
-        self.assertEqual(put_call_args['TableName'], 'DinnerBotIngredients')
-        self.assertEqual(put_call_args['Item']['user_id']['S'], self.test_user_id)
+        result = self.storage.add_ingredients(self.test_user_id, ['キャベツ', 'にんじん', 'キャベツ'])
         
-        # Check ingredients (order might vary due to set conversion)
-        ingredients = [item['S'] for item in put_call_args['Item']['ingredients']['L']]
-        self.assertIn('キャベツ', ingredients)
-        self.assertIn('鶏肉', ingredients)
+        self.assertTrue(result)
+        update_call_args = self.mock_dynamodb.update_item.call_args[1]
+        ingredients = update_call_args['ExpressionAttributeValues'][':new_ingredients']['SS']
+        self.assertEqual(ingredients, ['キャベツ', 'にんじん'])
     
-    def test_add_ingredients_existing_user(self):
-        """Test adding ingredients to existing user's list"""
-        # Mock get_item to return existing ingredients
+    def test_add_ingredients_legacy_list_item(self):
+        """Test that a legacy list item is rewritten as a string set"""
+        from botocore.exceptions import ClientError
+        
+        # ADD on a list attribute fails with a type mismatch
+        self.mock_dynamodb.update_item.side_effect = ClientError(
+            {'Error': {'Code': 'ValidationException'}},
+            'UpdateItem'
+        )
         self.mock_dynamodb.get_item.return_value = {
             'Item': {
                 'user_id': {'S': self.test_user_id},
                 'ingredients': {
-                    'L': [{'S': 'キャベツ'}]
+                    'L': [{'S': 'キャベツ'}, {'S': '鶏肉'}]
                 }
             }
         }
         
-        # Mock put_item to succeed
-        self.mock_dynamodb.put_item.return_value = {'ResponseMetadata': {'HTTPStatusCode': 200}}
-        
-        result = self.storage.add_ingredients(self.test_user_id, ['鶏肉', 'にんじん'])
+        result = self.storage.add_ingredients(self.test_user_id, ['キャベツ', 'にんじん'])
         
         self.assertTrue(result)
-        
-        # Check that all ingredients are included (no duplicates)
         put_call_args = self.mock_dynamodb.put_item.call_args[1]
-        ingredients = [item['S'] for item in put_call_args['Item']['ingredients']['L']]
-        self.assertEqual(len(ingredients), 3)
-        self.assertIn('キャベツ', ingredients)
-        self.assertIn('鶏肉', ingredients)
-        self.assertIn('にんじん', ingredients)
+        self.assertEqual(put_call_args['Item']['user_id']['S'], self.test_user_id)
+        self.assertEqual(put_call_args['Item']['ingredients']['SS'], ['キャベツ', '鶏肉', 'にんじん'])
+        # The rewrite only applies while the attribute is still a list
+        self.assertEqual(put_call_args['ConditionExpression'], 'attribute_type(ingredients, :list_type)')
     
-    def test_add_ingredients_duplicate_handling(self):
-        """Test that duplicate ingredients are not added"""
-        # Mock get_item to return existing ingredients
+    def test_add_ingredients_validation_error_on_set_item(self):
+        """Test that a ValidationException on a string set item never rewrites it"""
+        from botocore.exceptions import ClientError
+        
+        self.mock_dynamodb.update_item.side_effect = ClientError(
+            {'Error': {'Code': 'ValidationException'}},
+            'UpdateItem'
+        )
         self.mock_dynamodb.get_item.return_value = {
             'Item': {
                 'user_id': {'S': self.test_user_id},
-                'ingredients': {
-                    'L': [{'S': 'キャベツ'}, {'S': '鶏肉'}]
-                }
+                'ingredients': {'SS': ['キャベツ']}
             }
         }
         
-        # Mock put_item to succeed
-        self.mock_dynamodb.put_item.return_value = {'ResponseMetadata': {'HTTPStatusCode': 200}}
+        self.assertFalse(self.storage.add_ingredients(self.test_user_id, ['にんじん']))
+        self.mock_dynamodb.put_item.assert_not_called()
+    
+    def test_add_ingredients_legacy_read_error(self):
+        """Test that a failed read during migration does not wipe the stored list"""
+        from botocore.exceptions import ClientError
         
-        result = self.storage.add_ingredients(self.test_user_id, ['キャベツ', 'にんじん'])
+        self.mock_dynamodb.update_item.side_effect = ClientError(
+            {'Error': {'Code': 'ValidationException'}},
+            'UpdateItem'
+        )
+        self.mock_dynamodb.get_item.side_effect = ClientError(
+            {'Error': {'Code': 'ProvisionedThroughputExceededException'}},
+            'GetItem'
+        )
         
-        self.assertTrue(result)
+        self.assertFalse(self.storage.add_ingredients(self.test_user_id, ['にんじん']))
+        self.mock_dynamodb.put_item.assert_not_called()
+    
+    def test_add_ingredients_legacy_migrated_concurrently(self):
+        """Test that a lost migration race falls back to ADD on the new set"""
+        from botocore.exceptions import ClientError
         
-        # Check that キャベツ is not duplicated
-        put_call_args = self.mock_dynamodb.put_item.call_args[1]
-        ingredients = [item['S'] for item in put_call_args['Item']['ingredients']['L']]
-        self.assertEqual(len(ingredients), 3)  # Should have 3 unique ingredients
-        self.assertEqual(ingredients.count('キャベツ'), 1)  # No duplicates
+        self.mock_dynamodb.update_item.side_effect = [
+            ClientError({'Error': {'Code': 'ValidationException'}}, 'UpdateItem'),
+            {'Attributes': {'ingredients': {'SS': ['キャベツ', 'にんじん']}}}
+        ]
+        self.mock_dynamodb.get_item.return_value = {
+            'Item': {
+                'user_id': {'S': self.test_user_id},
+                'ingredients': {'L': [{'S': 'キャベツ'}]}
+            }
+        }
+        self.mock_dynamodb.put_item.side_effect = ClientError(
+            {'Error': {'Code': 'ConditionalCheckFailedException'}},
+            'PutItem'
+        )
+        
+        self.assertTrue(self.storage.add_ingredients(self.test_user_id, ['にんじん']))
+        self.assertEqual(self.mock_dynamodb.update_item.call_count, 2)
+        self.assertEqual(sorted(self.storage.get_ingredients(self.test_user_id)), ['にんじん', 'キャベツ'])
+    
+    def test_get_ingredients_cached(self):
+        """Test that a repeated read is served from the in-memory cache"""
+        self.mock_dynamodb.get_item.return_value = {
+            'Item': {
+                'user_id': {'S': self.test_user_id},
+                'ingredients': {'SS': ['キャベツ']}
+            }
+        }
+        
+        self.storage.get_ingredients(self.test_user_id)
+        result = self.storage.get_ingredients(self.test_user_id)
+        
+        self.assertEqual(result, ['キャベツ'])
+        self.mock_dynamodb.get_item.assert_called_once()
+    
+    def test_add_ingredients_updates_cache(self):
+        """Test that the merged set returned by UpdateItem refreshes the cache"""
+        self.mock_dynamodb.get_item.return_value = {}
+        self.storage.get_ingredients(self.test_user_id)
+        self.mock_dynamodb.update_item.return_value = {
+            'Attributes': {'ingredients': {'SS': ['キャベツ', '鶏肉']}}
+        }
+        
+        self.storage.add_ingredients(self.test_user_id, ['キャベツ', '鶏肉'])
+        result = self.storage.get_ingredients(self.test_user_id)
+        
+        self.assertEqual(sorted(result), sorted(['キャベツ', '鶏肉']))
+        self.mock_dynamodb.get_item.assert_called_once()
+    
+    def test_add_ingredients_writes_despite_cached_entry(self):
+        """Test that a cached copy never short-circuits the write
+
+        Another container may have cleared the item since it was cached, so
+        re-adding an ingredient the cache already lists must still reach DynamoDB.
+        """
+        self.mock_dynamodb.get_item.return_value = {
+            'Item': {
+                'user_id': {'S': self.test_user_id},
+                'ingredients': {'SS': ['キャベツ']}
+            }
+        }
+        self.storage.get_ingredients(self.test_user_id)
+        # Item cleared elsewhere; ADD recreates it with just the new ingredient
+        self.mock_dynamodb.update_item.return_value = {
+            'Attributes': {'ingredients': {'SS': ['キャベツ']}}
+        }
+        
+        self.assertTrue(self.storage.add_ingredients(self.test_user_id, ['キャベツ']))
+        self.mock_dynamodb.update_item.assert_called_once()
+        
+        # Only an empty add skips DynamoDB
+        self.assertTrue(self.storage.add_ingredients(self.test_user_id, []))
+        self.mock_dynamodb.update_item.assert_called_once()
+    
+    def test_prefetch_ingredients(self):
+        """Test that prefetched users are read from the cache afterwards"""
+        self.mock_dynamodb.batch_get_item.return_value = {
+            'Responses': {
+                'DinnerBotIngredients': [
+                    {'user_id': {'S': 'user_a'}, 'ingredients': {'SS': ['キャベツ']}}
+                ]
+            },
+            'UnprocessedKeys': {
+                'DinnerBotIngredients': {'Keys': [{'user_id': {'S': 'user_c'}}]}
+            }
+        }
+        self.mock_dynamodb.get_item.return_value = {}
+        
+        self.storage.prefetch_ingredients(['user_a', 'user_b', 'user_c'])
+        
+        self.assertEqual(self.storage.get_ingredients('user_a'), ['キャベツ'])
+        self.assertEqual(self.storage.get_ingredients('user_b'), [])
+        self.mock_dynamodb.get_item.assert_not_called()
+        # Unprocessed keys fall back to GetItem
+        self.storage.get_ingredients('user_c')
+        self.mock_dynamodb.get_item.assert_called_once()
     
     def test_clear_ingredients(self):
         """Test clearing ingredients for a user"""
@@ -160,6 +289,11 @@ class TestIngredientStorage(unittest.TestCase):
         expected = "📋 登録済み食材:\n1. キャベツ\n2. 鶏肉\n3. にんじん"
         self.assertEqual(result, expected)
     
+    def test_split_ingredients_text(self):
+        """Test splitting comma- and space-separated ingredient input"""
+        self.assertEqual(split_ingredients_text('キャベツ 鶏肉'), ['キャベツ', '鶏肉'])
+        self.assertEqual(split_ingredients_text(' キャベツ、 鶏 もも肉 ,,卵 '), ['キャベツ', '鶏 もも肉', '卵'])
+    
     def test_error_handling_get_ingredients(self):
         """Test error handling in get_ingredients"""
         from botocore.exceptions import ClientError
@@ -179,11 +313,10 @@ class TestIngredientStorage(unittest.TestCase):
         """Test error handling in add_ingredients"""
         from botocore.exceptions import ClientError
         
-        # Mock get_item to succeed but put_item to fail
-        self.mock_dynamodb.get_item.return_value = {}
-        self.mock_dynamodb.put_item.side_effect = ClientError(
-            {'Error': {'Code': 'ValidationException'}},
-            'PutItem'
+        # Mock update_item to fail
+        self.mock_dynamodb.update_item.side_effect = ClientError(
+            {'Error': {'Code': 'ProvisionedThroughputExceededException'}},
+            'UpdateItem'
         )
         
         result = self.storage.add_ingredients(self.test_user_id, ['キャベツ'])
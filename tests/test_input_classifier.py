@@ -0,0 +1,74 @@
+"""
+Test cases for mood/ingredient input classification
+"""
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'app')))
+
+import unittest
+from unittest.mock import patch
+
+import recipe_service
+from recipe_service import _is_mood_based_input
+
+
+# (input, is_mood_based) - results of the original substring-scan classifier
+CLASSIFICATION_CASES = [
+    ("さっぱりしたものが食べたい", True),
+    ("夏バテで食欲ないんだけど...", True),
+    ("ガッツリ系でスタミナつくもの", True),
+    ("こってり濃厚な気分", True),
+    ("ヘルシーで軽めがいい", True),
+    ("温まるものが食べたい", True),
+    ("疲れたから元気が出るもの", True),
+    ("さっぱり", True),
+    ("ガッツリ 系", True),
+    ("さっぱり、ヘルシー", True),
+    ("鶏肉とキャベツ", False),
+    ("豚肉、にんじん、玉ねぎ", False),
+    ("卵とトマトとベーコン", False),
+    ("白菜と豆腐が残ってる", False),
+    ("牛肉と大根がある", False),
+    ("鶏肉とキャベツで辛いもの", False),
+    ("卵の甘いやつ", False),
+    ("さっぱりと軽めの気分", False),
+    ("ＡＢＣ", False),
+    ("と", False),
+    ("", False),
+]
+
+# Width variants are folded with NFKC before matching
+NFKC_CASES = [
+    ("ｶﾞｯﾂﾘ", True),
+    ("ｶﾞｯﾂﾘ系が食べたい", True),
+    ("ﾍﾙｼｰ", True),
+]
+
+
+class TestIsMoodBasedInput(unittest.TestCase):
+    """Test cases for _is_mood_based_input"""
+
+    def setUp(self):
+        """Clear memoized results so each test exercises the matcher"""
+        _is_mood_based_input.cache_clear()
+        self.addCleanup(_is_mood_based_input.cache_clear)
+
+    def _assert_cases(self, cases):
+        """Assert the classification of every (input, expected) pair"""
+        for user_input, expected in cases:
+            with self.subTest(user_input=user_input):
+                self.assertIs(_is_mood_based_input(user_input), expected)
+
+    @unittest.skipIf(recipe_service.KEYWORD_AUTOMATON is None, "pyahocorasick is not installed")
+    def test_automaton(self):
+        """Test classification with the Aho-Corasick matcher"""
+        self._assert_cases(CLASSIFICATION_CASES + NFKC_CASES)
+
+    def test_regex_fallback(self):
+        """Test classification with the regex fallback used without pyahocorasick"""
+        with patch.object(recipe_service, 'KEYWORD_AUTOMATON', None):
+            self._assert_cases(CLASSIFICATION_CASES + NFKC_CASES)
+
+
+if __name__ == '__main__':
+    unittest.main()
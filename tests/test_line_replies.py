@@ -0,0 +1,148 @@
+"""
+Test cases for LINE webhook dispatch, replies and failure fallback
+"""
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'app')))
+
+import base64
+import hashlib
+import hmac
+import json
+import unittest
+from unittest.mock import Mock, patch
+
+from linebot import WebhookParser
+from linebot.models import TextSendMessage
+
+import line_bot
+from line_bot import LineBotHandler, PrekeyedSignatureValidator
+
+
+CHANNEL_SECRET = 'test-channel-secret'
+
+
+def _text_event(user_id, text):
+    """Build a text message webhook event"""
+    return {
+        'type': 'message',
+        'mode': 'active',
+        'timestamp': 1700000000000,
+        'replyToken': f'reply-{user_id}',
+        'source': {'type': 'user', 'userId': user_id},
+        'webhookEventId': f'event-{user_id}',
+        'deliveryContext': {'isRedelivery': False},
+        'message': {'id': f'msg-{user_id}', 'type': 'text', 'text': text}
+    }
+
+
+def _sign(body):
+    """Compute the X-Line-Signature for a body"""
+    digest = hmac.new(CHANNEL_SECRET.encode('utf-8'), body.encode('utf-8'), hashlib.sha256).digest()
+    return base64.b64encode(digest).decode('utf-8')
+
+
+class TestLineReplies(unittest.TestCase):
+    """Test cases for LineBotHandler._reply / _flush_replies"""
+
+    def setUp(self):
+        """Set up a handler with a stubbed LINE API client"""
+        self.handler = LineBotHandler.__new__(LineBotHandler)
+        self.handler.line_bot_api = Mock()
+        self.handler._pending_replies = []
+        self.general_error = line_bot.ERROR_REPLY_MESSAGES["general"]
+
+    def test_successful_reply(self):
+        """Test that a successful reply is sent once"""
+        message = TextSendMessage(text="親子丼")
+        self.handler._reply("token-1", message)
+        self.handler._flush_replies()
+
+        self.handler.line_bot_api.reply_message.assert_called_once_with("token-1", message)
+
+    def test_failed_reply_sends_general_error(self):
+        """Test that a rejected reply falls back to the error message on the same token"""
+        message = TextSendMessage(text="親子丼")
+        self.handler.line_bot_api.reply_message.side_effect = [Exception("400 Bad Request"), None]
+
+        self.handler._reply("token-1", message)
+        self.handler._flush_replies()
+
+        calls = self.handler.line_bot_api.reply_message.call_args_list
+        self.assertEqual(len(calls), 2)
+        self.assertEqual(calls[1].args, ("token-1", self.general_error))
+
+    def test_failed_error_reply_not_retried(self):
+        """Test that a failed error reply is not followed by another error reply"""
+        self.handler.line_bot_api.reply_message.side_effect = Exception("Invalid reply token")
+
+        self.handler._reply("token-1", self.general_error)
+        self.handler._flush_replies()
+
+        self.handler.line_bot_api.reply_message.assert_called_once()
+
+    def test_fallback_failure_is_swallowed(self):
+        """Test that a failing fallback reply does not raise from the flush"""
+        self.handler.line_bot_api.reply_message.side_effect = Exception("Invalid reply token")
+
+        self.handler._reply("token-1", TextSendMessage(text="親子丼"))
+        self.handler._flush_replies()
+
+        self.assertEqual(self.handler.line_bot_api.reply_message.call_count, 2)
+        self.assertEqual(self.handler._pending_replies, [])
+
+
+class TestLineWebhook(unittest.TestCase):
+    """Test cases for LineBotHandler.handle_webhook"""
+
+    def setUp(self):
+        """Set up a handler with a real parser and stubbed services"""
+        self.handler = LineBotHandler.__new__(LineBotHandler)
+        self.handler.line_bot_api = Mock()
+        self.handler.ingredient_storage = Mock()
+        self.handler._pending_replies = []
+        self.handler.webhook_parser = WebhookParser(CHANNEL_SECRET)
+        self.handler.webhook_parser.signature_validator = PrekeyedSignatureValidator(CHANNEL_SECRET)
+
+    def test_batched_events_prefetched_and_dispatched(self):
+        """Test that a multi-event body is parsed once, prefetched and dispatched per event"""
+        body = json.dumps({'destination': 'U0', 'events': [
+            _text_event('U1', '一覧'),
+            _text_event('U2', 'リスト'),
+            _text_event('U3', 'キャベツ')
+        ]})
+
+        with patch.object(self.handler, '_handle_text_message') as mock_handle, \
+                patch('linebot.webhook.json.loads', wraps=json.loads) as mock_loads:
+            response = self.handler.handle_webhook(body, _sign(body))
+
+        self.assertEqual(response['statusCode'], 200)
+        mock_loads.assert_called_once()
+        self.handler.ingredient_storage.prefetch_ingredients.assert_called_once_with(['U1', 'U2'])
+        self.assertEqual([call.args[0].source.user_id for call in mock_handle.call_args_list],
+                         ['U1', 'U2', 'U3'])
+
+    def test_single_event_not_prefetched(self):
+        """Test that a single-event body skips the batch read"""
+        body = json.dumps({'destination': 'U0', 'events': [_text_event('U1', '一覧')]})
+
+        with patch.object(self.handler, '_handle_text_message') as mock_handle:
+            response = self.handler.handle_webhook(body, _sign(body))
+
+        self.assertEqual(response['statusCode'], 200)
+        self.handler.ingredient_storage.prefetch_ingredients.assert_not_called()
+        mock_handle.assert_called_once()
+
+    def test_invalid_signature(self):
+        """Test that a bad signature is rejected before any event is handled"""
+        body = json.dumps({'destination': 'U0', 'events': [_text_event('U1', '一覧')]})
+
+        with patch.object(self.handler, '_handle_text_message') as mock_handle:
+            response = self.handler.handle_webhook(body, 'invalid')
+
+        self.assertEqual(response['statusCode'], 400)
+        mock_handle.assert_not_called()
+
+
+if __name__ == '__main__':
+    unittest.main()
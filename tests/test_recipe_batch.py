@@ -0,0 +1,140 @@
+"""
+Test cases for Bedrock batch inference recipe generation
+"""
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'app')))
+
+import json
+import unittest
+from unittest.mock import Mock, patch
+
+import recipe_service
+from recipe_service import RecipeService, BATCH_MIN_RECORDS
+
+
+JOB_ARN = 'arn:aws:bedrock:ap-northeast-1:123456789012:model-invocation-job/abc123'
+
+
+def _output_line(record_id, text):
+    """Build one successful record of a batch output file"""
+    return json.dumps({
+        'recordId': str(record_id),
+        'modelInput': {},
+        'modelOutput': {'content': [{'type': 'text', 'text': text}]}
+    }, ensure_ascii=False)
+
+
+class TestGenerateRecipeBatch(unittest.TestCase):
+    """Test cases for RecipeService.generate_recipe_batch"""
+
+    def setUp(self):
+        """Set up stubbed S3 and Bedrock clients"""
+        self.mock_s3 = Mock()
+        self.mock_bedrock = Mock()
+        self.mock_bedrock.create_model_invocation_job.return_value = {'jobArn': JOB_ARN}
+        self.mock_bedrock.get_model_invocation_job.side_effect = [
+            {'status': 'InProgress'},
+            {'status': 'Completed'}
+        ]
+        clients = {'s3': self.mock_s3, 'bedrock': self.mock_bedrock, 'bedrock-runtime': Mock()}
+
+        patchers = [
+            patch('recipe_service.get_client', side_effect=lambda name, *args, **kwargs: clients[name]),
+            patch.object(recipe_service.config, 'bedrock_batch_bucket', 'batch-bucket'),
+            patch.object(recipe_service.config, 'bedrock_batch_role_arn', 'arn:aws:iam::123456789012:role/batch'),
+            patch('recipe_service.time.sleep'),
+        ]
+        for patcher in patchers:
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+        self.service = RecipeService()
+        self.inputs = ['さっぱりしたものが食べたい'] + [f'鶏肉とキャベツ{i}' for i in range(1, BATCH_MIN_RECORDS)]
+
+    def _set_output(self, lines):
+        """Make the S3 stub return the given lines as the job output file"""
+        self.mock_s3.get_object.return_value = {
+            'Body': Mock(read=Mock(return_value='\n'.join(lines).encode('utf-8')))
+        }
+
+    def test_too_few_inputs_rejected_before_upload(self):
+        """Test that fewer than BATCH_MIN_RECORDS inputs fail before any AWS call"""
+        with self.assertRaises(ValueError):
+            self.service.generate_recipe_batch(self.inputs[:BATCH_MIN_RECORDS - 1])
+
+        self.mock_s3.put_object.assert_not_called()
+        self.mock_bedrock.create_model_invocation_job.assert_not_called()
+
+    def test_input_records(self):
+        """Test the uploaded JSONL records and the job's S3 locations"""
+        self._set_output([])
+
+        self.service.generate_recipe_batch(self.inputs)
+
+        put_kwargs = self.mock_s3.put_object.call_args.kwargs
+        records = [json.loads(line) for line in put_kwargs['Body'].splitlines()]
+        self.assertEqual([record['recordId'] for record in records], [str(i) for i in range(len(self.inputs))])
+        self.assertEqual(records[0]['modelInput']['messages'][0]['content'][0]['text'],
+                         'ユーザーの気分・希望: さっぱりしたものが食べたい')
+
+        job_kwargs = self.mock_bedrock.create_model_invocation_job.call_args.kwargs
+        input_uri = job_kwargs['inputDataConfig']['s3InputDataConfig']['s3Uri']
+        self.assertEqual(input_uri, f"s3://batch-bucket/{put_kwargs['Key']}")
+
+        output_key = self.mock_s3.get_object.call_args.kwargs['Key']
+        self.assertTrue(output_key.endswith('/output/abc123/input.jsonl.out'))
+
+    def test_job_uses_bedrock_model_under_claude_sdk_backend(self):
+        """Test that the job is created with the Bedrock model ID, not the SDK placeholder"""
+        self._set_output([])
+        self.service.model_id = 'claude-sdk'
+
+        self.service.generate_recipe_batch(self.inputs)
+
+        job_kwargs = self.mock_bedrock.create_model_invocation_job.call_args.kwargs
+        self.assertEqual(job_kwargs['modelId'], recipe_service.config.bedrock_model_id)
+
+    def test_results_ordered_by_record_id(self):
+        """Test that out-of-order output lines map back to their inputs"""
+        self._set_output([
+            _output_line(i, f"1. [メニュー{i}]\n   - 説明{i}")
+            for i in reversed(range(len(self.inputs)))
+        ])
+
+        results = self.service.generate_recipe_batch(self.inputs)
+
+        self.assertEqual(len(results), len(self.inputs))
+        for i, result in enumerate(results):
+            self.assertTrue(result['success'])
+            self.assertEqual(result['recipes'], [{'number': '1', 'name': f'メニュー{i}', 'description': f'説明{i}'}])
+        self.assertEqual(results[0]['input_type'], 'mood')
+        self.assertEqual(results[1]['input_type'], 'ingredient')
+
+    def test_failed_and_missing_records(self):
+        """Test that errored or absent records become failed results"""
+        self._set_output([
+            _output_line(0, "1. [親子丼]\n   - 定番。"),
+            json.dumps({'recordId': '1', 'modelInput': {}, 'error': {'errorMessage': 'throttled'}}),
+            ''
+        ])
+
+        results = self.service.generate_recipe_batch(self.inputs)
+
+        self.assertTrue(results[0]['success'])
+        for result in results[1:]:
+            self.assertFalse(result['success'])
+            self.assertIsNone(result['recipes'])
+            self.assertEqual(result['input_type'], 'ingredient')
+
+    def test_failed_job_raises(self):
+        """Test that a job ending in a failure status raises"""
+        self.mock_bedrock.get_model_invocation_job.side_effect = [{'status': 'Failed'}]
+
+        with self.assertRaises(RuntimeError):
+            self.service.generate_recipe_batch(self.inputs)
+        self.mock_s3.get_object.assert_not_called()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,155 @@
+"""
+Test cases for recipe response parsing
+"""
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'app')))
+
+import unittest
+from unittest.mock import patch
+
+from recipe_service import RecipeService
+
+
+# Representative model output for the mood prompt format (name + description)
+MOOD_RESPONSE = """1. [鶏むね肉のさっぱり南蛮]
+   - 甘酢だれで仕上げる爽やかな一品。
+
+2. [冷やし中華]
+   - 夏にぴったりの冷たい麺料理。
+
+3. [トマトの冷製パスタ]
+   - トマトとバジルで軽やかに。"""
+
+# Representative model output for the ingredient prompt format (+ additional ingredients)
+INGREDIENT_RESPONSE = """以下のメニューはいかがでしょうか。
+
+1. [鶏肉とキャベツの味噌炒め]
+   - 甘辛い味噌だれでご飯が進む炒め物。
+   - 追加で必要な材料: 味噌、みりん
+
+2. [キャベツと鶏肉のスープ]
+   - 野菜の旨みが溶け出した優しいスープ。
+   - 追加で必要な材料: （もしあれば）
+
+3. [鶏肉のキャベツ巻き]
+   - ロールキャベツ風に煮込んだ一品。
+   - 追加で必要な材料: なし"""
+
+# A continuation line that starts with a number ("1.5倍") is not a new recipe
+DECIMAL_RESPONSE = """1. [豚の生姜焼き]
+   - 甘辛いたれで焼く定番。
+1.5倍量でも作りやすい。
+
+2. [野菜炒め]
+   - シャキシャキに仕上げる。"""
+
+
+class TestParseRecipes(unittest.TestCase):
+    """Test cases for RecipeService._parse_recipes"""
+
+    def setUp(self):
+        """Set up a service without creating a Bedrock client"""
+        self.service = RecipeService.__new__(RecipeService)
+
+    def test_mood_format(self):
+        """Test parsing the mood prompt format"""
+        self.assertEqual(self.service._parse_recipes(MOOD_RESPONSE), [
+            {'number': '1', 'name': '鶏むね肉のさっぱり南蛮', 'description': '甘酢だれで仕上げる爽やかな一品。'},
+            {'number': '2', 'name': '冷やし中華', 'description': '夏にぴったりの冷たい麺料理。'},
+            {'number': '3', 'name': 'トマトの冷製パスタ', 'description': 'トマトとバジルで軽やかに。'}
+        ])
+
+    def test_ingredient_format(self):
+        """Test parsing the ingredient prompt format, skipping placeholder additions"""
+        self.assertEqual(self.service._parse_recipes(INGREDIENT_RESPONSE), [
+            {'number': '1', 'name': '鶏肉とキャベツの味噌炒め',
+             'description': '甘辛い味噌だれでご飯が進む炒め物。\n🛒 追加で必要: 味噌、みりん'},
+            {'number': '2', 'name': 'キャベツと鶏肉のスープ', 'description': '野菜の旨みが溶け出した優しいスープ。'},
+            {'number': '3', 'name': '鶏肉のキャベツ巻き', 'description': 'ロールキャベツ風に煮込んだ一品。'}
+        ])
+
+    def test_continuation_lines_keep_indentation(self):
+        """Test that continuation and ** lines stay in the description as written"""
+        response = "1. [カレー]\n   - スパイス香る一皿。\n   **ポイント** 弱火で煮込む\n   - 追加で必要: ルー"
+
+        self.assertEqual(self.service._parse_recipes(response), [
+            {'number': '1', 'name': 'カレー',
+             'description': 'スパイス香る一皿。\n   **ポイント** 弱火で煮込む\n🛒 追加で必要: ルー'}
+        ])
+
+    def test_decimal_description_line_not_a_title(self):
+        """Test that a description line starting with a decimal stays in the recipe"""
+        self.assertEqual(self.service._parse_recipes(DECIMAL_RESPONSE), [
+            {'number': '1', 'name': '豚の生姜焼き', 'description': '甘辛いたれで焼く定番。\n1.5倍量でも作りやすい。'},
+            {'number': '2', 'name': '野菜炒め', 'description': 'シャキシャキに仕上げる。'}
+        ])
+
+    def test_titles_without_brackets(self):
+        """Test parsing numbered titles written without brackets"""
+        response = "1. 親子丼\n   - 卵でとじる\n2.牛丼\n甘辛く煮る"
+
+        self.assertEqual(self.service._parse_recipes(response), [
+            {'number': '1', 'name': '親子丼', 'description': '卵でとじる'},
+            {'number': '2', 'name': '牛丼', 'description': '甘辛く煮る'}
+        ])
+
+    def test_no_recipes(self):
+        """Test that text without numbered titles yields no recipes"""
+        self.assertEqual(self.service._parse_recipes(''), [])
+        self.assertEqual(self.service._parse_recipes('特に提案はありません'), [])
+
+
+class TestStreamRecipes(unittest.TestCase):
+    """Test cases for RecipeService._stream_recipes boundary splitting"""
+
+    def setUp(self):
+        """Set up a service without creating a Bedrock client"""
+        self.service = RecipeService.__new__(RecipeService)
+
+    def _stream(self, deltas):
+        """Run _stream_recipes over the given text deltas"""
+        with patch.object(self.service, '_invoke_claude_stream', return_value=iter(deltas)):
+            return list(self.service._stream_recipes(b''))
+
+    def test_deltas_split_through_boundary(self):
+        """Test that a "\\n2." header cut across deltas still splits correctly"""
+        full = self.service._parse_recipes(INGREDIENT_RESPONSE)
+        cut = INGREDIENT_RESPONSE.index('\n2.') + 1
+        deltas = [
+            INGREDIENT_RESPONSE[:cut],
+            INGREDIENT_RESPONSE[cut:cut + 1],
+            INGREDIENT_RESPONSE[cut + 1:]
+        ]
+
+        self.assertEqual(self._stream(deltas), full)
+
+    def test_every_split_point_matches_full_parse(self):
+        """Test that two-delta splits at any offset give the full-text result"""
+        for text in (MOOD_RESPONSE, INGREDIENT_RESPONSE, DECIMAL_RESPONSE):
+            full = self.service._parse_recipes(text)
+            for cut in range(1, len(text)):
+                with self.subTest(cut=cut):
+                    self.assertEqual(self._stream([text[:cut], text[cut:]]), full)
+
+    def test_single_character_deltas(self):
+        """Test streaming one character per delta"""
+        self.assertEqual(self._stream(list(MOOD_RESPONSE)), self.service._parse_recipes(MOOD_RESPONSE))
+
+    def test_recipe_yielded_before_stream_ends(self):
+        """Test that a finished recipe is yielded once the next header arrives"""
+        def deltas():
+            yield "1. [親子丼]\n   - 定番。\n\n"
+            yield "2"
+            yield ". [牛丼]\n"
+            # The first recipe must already be out before the stream continues
+            raise AssertionError("stream consumed past the second header")
+
+        with patch.object(self.service, '_invoke_claude_stream', return_value=deltas()):
+            first = next(self.service._stream_recipes(b''))
+
+        self.assertEqual(first, {'number': '1', 'name': '親子丼', 'description': '定番。'})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,112 @@
+"""
+Test cases for the in-process recipe response cache
+"""
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'app')))
+
+import json
+import unittest
+from unittest.mock import Mock, patch
+
+import recipe_service
+from recipe_service import RecipeService
+
+
+MODEL_TEXT = "1. [親子丼]\n   - 鶏肉と卵で作る定番。"
+
+
+def _invoke_response(*args, **kwargs):
+    """Build a fresh invoke_model response (the body stream is single-use)"""
+    body = json.dumps({'content': [{'type': 'text', 'text': MODEL_TEXT}]}).encode('utf-8')
+    return {'body': Mock(read=Mock(return_value=body))}
+
+
+class TestResponseCache(unittest.TestCase):
+    """Test cases for RecipeService.generate_recipe response caching"""
+
+    def setUp(self):
+        """Set up a service with a stubbed Bedrock runtime client"""
+        self.mock_bedrock = Mock()
+        self.mock_bedrock.invoke_model.side_effect = _invoke_response
+
+        patchers = [
+            patch('recipe_service.get_client', return_value=self.mock_bedrock),
+            patch.object(recipe_service.config, 'bedrock_temperature', 0.3),
+            patch.object(recipe_service.config, 'bedrock_streaming', False),
+            patch.object(recipe_service.config, 'bedrock_latency_optimized', False),
+        ]
+        for patcher in patchers:
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+        recipe_service._response_cache.clear()
+        self.addCleanup(recipe_service._response_cache.clear)
+        self.service = RecipeService()
+
+    def test_repeated_input_skips_invoke(self):
+        """Test that a repeated input is served from the cache"""
+        first = self.service.generate_recipe("鶏肉と卵")
+        second = self.service.generate_recipe("鶏肉と卵")
+
+        self.assertEqual(self.mock_bedrock.invoke_model.call_count, 1)
+        self.assertEqual(second, first)
+        self.assertEqual(second['recipes'][0]['name'], '親子丼')
+
+    def test_cached_result_is_a_copy(self):
+        """Test that callers mutating a result do not change the cached entry"""
+        self.service.generate_recipe("鶏肉と卵")['recipes'][0]['description'] += "\n🛒 追加"
+
+        self.assertEqual(self.service.generate_recipe("鶏肉と卵")['recipes'][0]['description'],
+                         '鶏肉と卵で作る定番。')
+
+    def test_equivalent_ingredient_lists_share_entry(self):
+        """Test that reordered or differently separated ingredients hit the same entry"""
+        for user_input in ("キャベツと鶏肉", "鶏肉、キャベツ", "鶏肉 キャベツ", "ｷｬﾍﾞﾂと鶏肉"):
+            self.assertTrue(self.service.generate_recipe(user_input)['success'])
+
+        self.assertEqual(self.mock_bedrock.invoke_model.call_count, 1)
+
+    def test_equivalent_mood_inputs_share_entry(self):
+        """Test that punctuation and width variants of a mood input hit the same entry"""
+        self.service.generate_recipe("さっぱりしたものが食べたい")
+        self.service.generate_recipe("さっぱりしたものが食べたい！")
+
+        self.assertEqual(self.mock_bedrock.invoke_model.call_count, 1)
+
+    def test_different_inputs_not_shared(self):
+        """Test that a different ingredient list invokes the model again"""
+        self.service.generate_recipe("キャベツと鶏肉")
+        self.service.generate_recipe("キャベツと豚肉")
+
+        self.assertEqual(self.mock_bedrock.invoke_model.call_count, 2)
+
+    def test_least_recently_used_entry_evicted(self):
+        """Test that a full cache evicts the least recently used entry"""
+        with patch.object(recipe_service, 'RESPONSE_CACHE_MAX_SIZE', 2):
+            self.service.generate_recipe("キャベツと鶏肉")
+            self.service.generate_recipe("大根と豚肉")
+            # Touch the first entry so the second becomes least recently used
+            self.service.generate_recipe("キャベツと鶏肉")
+            self.service.generate_recipe("白菜と豆腐")
+            self.assertEqual(self.mock_bedrock.invoke_model.call_count, 3)
+
+            self.service.generate_recipe("キャベツと鶏肉")
+            self.assertEqual(self.mock_bedrock.invoke_model.call_count, 3)
+            self.service.generate_recipe("大根と豚肉")
+            self.assertEqual(self.mock_bedrock.invoke_model.call_count, 4)
+
+        self.assertEqual(len(recipe_service._response_cache), 2)
+
+    def test_high_temperature_not_cached(self):
+        """Test that temperatures above the cache limit always invoke the model"""
+        self.service.temperature = 0.7
+
+        self.service.generate_recipe("鶏肉と卵")
+        self.service.generate_recipe("鶏肉と卵")
+
+        self.assertEqual(self.mock_bedrock.invoke_model.call_count, 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,66 @@
+"""
+Test cases for Slack slash command form parsing
+"""
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import unittest
+from urllib.parse import parse_qs
+from app.slack_forms import parse_form_fields
+
+
+class TestParseFormFields(unittest.TestCase):
+    """Test cases for parse_form_fields"""
+
+    def test_decodes_plus_and_percent_escapes(self):
+        """Test that + and %XX sequences are decoded"""
+        body = 'text=add+%E3%82%AD%E3%83%A3%E3%83%99%E3%83%84%E3%80%81%E9%B6%8F%E8%82%89&user_id=U123'
+
+        self.assertEqual(parse_form_fields(body, ('text', 'user_id')), {
+            'text': 'add キャベツ、鶏肉',
+            'user_id': 'U123'
+        })
+
+    def test_decodes_response_url(self):
+        """Test decoding an escaped response_url"""
+        body = 'response_url=https%3A%2F%2Fhooks.slack.com%2Fcommands%2FT1%2F2%2Fabc'
+
+        self.assertEqual(parse_form_fields(body, ('response_url',)), {
+            'response_url': 'https://hooks.slack.com/commands/T1/2/abc'
+        })
+
+    def test_empty_values_omitted(self):
+        """Test that empty and value-less fields are left out"""
+        body = 'text=&user_id=U123&response_url'
+
+        self.assertEqual(parse_form_fields(body, ('text', 'user_id', 'response_url')), {'user_id': 'U123'})
+
+    def test_repeated_key_first_wins(self):
+        """Test that the first non-empty occurrence of a key wins"""
+        self.assertEqual(parse_form_fields('text=first&text=second', ('text',)), {'text': 'first'})
+        self.assertEqual(parse_form_fields('text=&text=second', ('text',)), {'text': 'second'})
+
+    def test_missing_key(self):
+        """Test that a requested key absent from the body is not returned"""
+        body = 'token=abc&user_id=U123'
+
+        self.assertEqual(parse_form_fields(body, ('text', 'user_id')), {'user_id': 'U123'})
+        self.assertEqual(parse_form_fields('', ('text',)), {})
+
+    def test_matches_parse_qs(self):
+        """Test agreement with parse_qs(...)[key][0] on a full slash command body"""
+        body = (
+            'token=xyzz0WbapA4vBCDEFasx0q6G&team_id=T1DC2JH3J&channel_id=G8PSS9T3V'
+            '&user_id=U2CERLKJA&command=%2Fdinner&text=%E3%81%95%E3%81%A3%E3%81%B1%E3%82%8A+%E7%B3%BB'
+            '&response_url=https%3A%2F%2Fhooks.slack.com%2Fcommands%2FT1DC2JH3J%2F3977%2F96rG'
+            '&trigger_id=398738663015.47445629121.803a0bc887a14d10d2c447fce8b6703c'
+        )
+        keys = ('text', 'response_url', 'user_id')
+        expected = {key: values[0] for key, values in parse_qs(body).items() if key in keys}
+
+        self.assertEqual(parse_form_fields(body, keys), expected)
+
+
+if __name__ == '__main__':
+    unittest.main()
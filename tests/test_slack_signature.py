@@ -0,0 +1,96 @@
+"""
+Test cases for Slack request signature verification
+"""
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'app')))
+
+import unittest
+from unittest.mock import patch
+
+import slack_bot
+from slack_bot import SlackBotHandler
+
+
+# Example request from Slack's "Verifying requests from Slack" documentation
+SIGNING_SECRET = '8f742231b10e8888abcd99yyyzzz85a5'
+TIMESTAMP = '1531420618'
+BODY = (
+    'token=xyzz0WbapA4vBCDEFasx0q6G&team_id=T1DC2JH3J&team_domain=testteamnow'
+    '&channel_id=G8PSS9T3V&channel_name=foobar&user_id=U2CERLKJA&user_name=roadrunner'
+    '&command=%2Fwebhook-collect&text=&response_url=https%3A%2F%2Fhooks.slack.com'
+    '%2Fcommands%2FT1DC2JH3J%2F397700885554%2F96rGlfmibIGlgcZRskXaIFfN'
+    '&trigger_id=398738663015.47445629121.803a0bc887a14d10d2c447fce8b6703c'
+)
+SIGNATURE = 'v0=a2114d57b48eac39b9ad189dd8316235a7b4a8d21a10bd27519666489c69b503'
+
+
+class TestSlackSignature(unittest.TestCase):
+    """Test cases for SlackBotHandler._verify_signature"""
+
+    def setUp(self):
+        """Set up a handler keyed with the example signing secret"""
+        patchers = [
+            patch.object(slack_bot.config, 'slack_signing_secret', SIGNING_SECRET),
+            patch.object(slack_bot.config, 'slack_bot_token', 'xoxb-test'),
+            patch('slack_bot.get_recipe_service'),
+            patch('slack_bot.IngredientStorage'),
+            # Pin the clock just after the example request was signed
+            patch('slack_bot.time.time', return_value=int(TIMESTAMP) + 10),
+        ]
+        for patcher in patchers:
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+        self.handler = SlackBotHandler()
+        self.headers = {
+            'X-Slack-Request-Timestamp': TIMESTAMP,
+            'X-Slack-Signature': SIGNATURE
+        }
+
+    def test_valid_signature(self):
+        """Test that a correctly signed request is accepted"""
+        self.assertTrue(self.handler._verify_signature(BODY, self.headers))
+
+    def test_valid_signature_bytes_body(self):
+        """Test that a raw bytes body verifies the same as str"""
+        self.assertTrue(self.handler._verify_signature(BODY.encode('utf-8'), self.headers))
+
+    def test_header_names_case_insensitive(self):
+        """Test that lower-cased header names are accepted"""
+        headers = {key.lower(): value for key, value in self.headers.items()}
+        self.assertTrue(self.handler._verify_signature(BODY, headers))
+
+    def test_tampered_body(self):
+        """Test that a modified body is rejected"""
+        self.assertFalse(self.handler._verify_signature(BODY.replace('text=', 'text=x'), self.headers))
+
+    def test_wrong_signature(self):
+        """Test that a signature made with another secret is rejected"""
+        headers = dict(self.headers, **{'X-Slack-Signature': 'v0=' + '0' * 64})
+        self.assertFalse(self.handler._verify_signature(BODY, headers))
+
+    def test_missing_headers(self):
+        """Test that requests without signature headers are rejected"""
+        self.assertFalse(self.handler._verify_signature(BODY, {}))
+        self.assertFalse(self.handler._verify_signature(BODY, {'X-Slack-Signature': SIGNATURE}))
+
+    def test_stale_timestamp(self):
+        """Test that requests older than five minutes are rejected"""
+        with patch('slack_bot.time.time', return_value=int(TIMESTAMP) + 301):
+            self.assertFalse(self.handler._verify_signature(BODY, self.headers))
+
+    def test_non_integer_timestamp(self):
+        """Test that a malformed timestamp header is rejected"""
+        headers = dict(self.headers, **{'X-Slack-Request-Timestamp': 'abc'})
+        self.assertFalse(self.handler._verify_signature(BODY, headers))
+
+    def test_slash_command_rejects_bad_signature(self):
+        """Test that the slash command endpoint returns 401 on a bad signature"""
+        headers = dict(self.headers, **{'X-Slack-Signature': 'v0=' + '0' * 64})
+        response = self.handler.handle_slash_command(BODY, headers)
+        self.assertEqual(response['statusCode'], 401)
+
+
+if __name__ == '__main__':
+    unittest.main()